@@ -1,21 +1,76 @@
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 from dotenv import load_dotenv
 from typing import Optional
-from pydantic import BaseModel, Field
-
-class EnvConfig(BaseModel):
-    """Pydantic model for environment configuration"""
-    notion_api_key: Optional[str] = Field(default=None, description="Notion API key")
-    openai_api_key: Optional[str] = Field(default=None, description="OpenAI API key")
-    fastapi_host: str = Field(default="0.0.0.0", description="FastAPI host")
-    fastapi_port: int = Field(default=8000, description="FastAPI port")
-    fastapi_debug: bool = Field(default=True, description="FastAPI debug mode")
-    database_url: str = Field(default="sqlite:///./notion_agent.db", description="Database URL")
-    log_level: str = Field(default="INFO", description="Log level")
+
+@dataclass(frozen=True, slots=True)
+class EnvConfig:
+    """Immutable environment configuration"""
+    notion_api_key: Optional[str] = None  # Notion API key
+    openai_api_key: Optional[str] = None  # OpenAI API key
+    fastapi_host: str = "0.0.0.0"  # FastAPI host
+    fastapi_port: int = 8000  # FastAPI port
+    fastapi_debug: bool = True  # FastAPI debug mode
+    fastapi_workers: int = 1  # Uvicorn worker processes; limits and caches below apply per process
+    database_url: str = "sqlite:///./notion_agent.db"  # Database URL
+    log_level: str = "INFO"  # Log level
+    preprocess_cache: bool = False  # Reuse successful preprocessing results from the execution cache
+    openai_concurrency: int = 8  # Max agent runs talking to OpenAI at once
+    openai_queue_size: int = 64  # Max agent runs waiting for a slot before rejecting
+    agent_max_iters: int = 10  # Max agent iterations per run
+    agent_max_sec: int = 45  # Wall-clock budget per agent run, in seconds
+    exec_cache_ttl: int = 3600  # Seconds agent results stay in the execution cache (0 disables it)
+    block_exec_cache_ttl: int = 60  # Seconds a block agent run that created blocks is not repeated (0 disables it)
+    agent_verbose: bool = False  # Print every agent step to stdout (debugging only)
+    search_cache_ttl: int = 60  # Seconds Notion page search results are reused per query (0 disables it)
+
+# .env lives next to this module (server/config/.env)
+ENV_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+
+_LOADED = False
 
 def load_env_config() -> None:
-    """Load environment variables from .env file"""
-    pass  # Environment variables are now loaded in main.py
+    """Load environment variables from .env file (idempotent, parses the file at most once)"""
+    global _LOADED
+    if _LOADED:
+        return
+    load_dotenv(dotenv_path=ENV_FILE_PATH)
+    _LOADED = True
+
+# Parse .env exactly once, when the config module is first imported
+load_env_config()
+
+@lru_cache(maxsize=1)
+def get_env_config() -> EnvConfig:
+    """Get complete environment configuration
+    
+    Environment variables are read with os.environ.get and cast exactly once;
+    the individual getters below return fields of this cached instance.
+    
+    Returns:
+        EnvConfig dataclass with all environment settings
+    """
+    environ = os.environ
+    return EnvConfig(
+        notion_api_key=environ.get("NOTION_API_KEY"),
+        openai_api_key=environ.get("OPENAI_API_KEY"),
+        fastapi_host=environ.get("FASTAPI_HOST", "0.0.0.0"),
+        fastapi_port=int(environ.get("FASTAPI_PORT", "8000")),
+        fastapi_debug=environ.get("FASTAPI_DEBUG", "True").lower() == "true",
+        fastapi_workers=int(environ.get("FASTAPI_WORKERS", "1")),
+        database_url=environ.get("DATABASE_URL", "sqlite:///./notion_agent.db"),
+        log_level=environ.get("LOG_LEVEL", "INFO").upper(),
+        preprocess_cache=environ.get("PREPROCESS_CACHE", "0").lower() in ("1", "true"),
+        openai_concurrency=int(environ.get("OPENAI_CONCURRENCY", "8")),
+        openai_queue_size=int(environ.get("OPENAI_QUEUE_SIZE", "64")),
+        agent_max_iters=int(environ.get("AGENT_MAX_ITERS", "10")),
+        agent_max_sec=int(environ.get("AGENT_MAX_SEC", "45")),
+        exec_cache_ttl=int(environ.get("EXEC_CACHE_TTL", "3600")),
+        block_exec_cache_ttl=int(environ.get("BLOCK_EXEC_CACHE_TTL", "60")),
+        agent_verbose=environ.get("AGENT_VERBOSE", "0") == "1",
+        search_cache_ttl=int(environ.get("SEARCH_CACHE_TTL", "60"))
+    )
 
 def get_notion_api_key() -> Optional[str]:
     """Get Notion API key from environment variables
@@ -23,7 +78,7 @@ def get_notion_api_key() -> Optional[str]:
     Returns:
         Optional Notion API key string
     """
-    return os.getenv("NOTION_API_KEY")
+    return get_env_config().notion_api_key
 
 def get_openai_api_key() -> Optional[str]:
     """Get OpenAI API key from environment variables
@@ -31,7 +86,7 @@ def get_openai_api_key() -> Optional[str]:
     Returns:
         Optional OpenAI API key string
     """
-    return os.getenv("OPENAI_API_KEY")
+    return get_env_config().openai_api_key
 
 def get_fastapi_host() -> str:
     """Get FastAPI host from environment variables
@@ -39,7 +94,7 @@ def get_fastapi_host() -> str:
     Returns:
         FastAPI host string
     """
-    return os.getenv("FASTAPI_HOST", "0.0.0.0")
+    return get_env_config().fastapi_host
 
 def get_fastapi_port() -> int:
     """Get FastAPI port from environment variables
@@ -47,7 +102,7 @@ def get_fastapi_port() -> int:
     Returns:
         FastAPI port integer
     """
-    return int(os.getenv("FASTAPI_PORT", "8000"))
+    return get_env_config().fastapi_port
 
 def get_fastapi_debug() -> bool:
     """Get FastAPI debug mode from environment variables
@@ -55,7 +110,19 @@ def get_fastapi_debug() -> bool:
     Returns:
         FastAPI debug mode boolean
     """
-    return os.getenv("FASTAPI_DEBUG", "True").lower() == "true"
+    return get_env_config().fastapi_debug
+
+def get_fastapi_workers() -> int:
+    """Get number of Uvicorn worker processes from environment variables
+    
+    Every worker is a separate process with its own OPENAI_CONCURRENCY and OPENAI_QUEUE_SIZE
+    limits and its own in-memory caches, so N workers allow N times as many concurrent
+    OpenAI calls and do not share cached results or duplicate-batch suppression.
+    
+    Returns:
+        Worker count integer (defaults to 1)
+    """
+    return get_env_config().fastapi_workers
 
 def get_database_url() -> str:
     """Get database URL from environment variables
@@ -63,28 +130,86 @@ def get_database_url() -> str:
     Returns:
         Database URL string
     """
-    return os.getenv("DATABASE_URL", "sqlite:///./notion_agent.db")
+    return get_env_config().database_url
 
 def get_log_level() -> str:
     """Get log level from environment variables
     
     Returns:
-        Log level string
+        Log level string, upper-cased (LOG_LEVEL=debug works)
     """
-    return os.getenv("LOG_LEVEL", "INFO")
+    return get_env_config().log_level
 
-def get_env_config() -> EnvConfig:
-    """Get complete environment configuration as Pydantic model
+def get_preprocess_cache() -> bool:
+    """Get whether preprocessing results are memoized from environment variables
     
     Returns:
-        EnvConfig Pydantic model with all environment settings
+        True if PREPROCESS_CACHE is enabled
     """
-    return EnvConfig(
-        notion_api_key=get_notion_api_key(),
-        openai_api_key=get_openai_api_key(),
-        fastapi_host=get_fastapi_host(),
-        fastapi_port=get_fastapi_port(),
-        fastapi_debug=get_fastapi_debug(),
-        database_url=get_database_url(),
-        log_level=get_log_level()
-    )
+    return get_env_config().preprocess_cache
+
+def get_openai_concurrency() -> int:
+    """Get max concurrent agent runs against OpenAI from environment variables
+    
+    Returns:
+        Concurrency limit integer
+    """
+    return get_env_config().openai_concurrency
+
+def get_openai_queue_size() -> int:
+    """Get max number of agent runs allowed to wait for a slot from environment variables
+    
+    Returns:
+        Queue size integer
+    """
+    return get_env_config().openai_queue_size
+
+def get_agent_max_iters() -> int:
+    """Get max agent iterations per run from environment variables
+    
+    Returns:
+        Iteration limit integer
+    """
+    return get_env_config().agent_max_iters
+
+def get_agent_max_sec() -> int:
+    """Get wall-clock budget per agent run in seconds from environment variables
+    
+    Returns:
+        Time budget integer
+    """
+    return get_env_config().agent_max_sec
+
+def get_exec_cache_ttl() -> int:
+    """Get execution cache time-to-live in seconds from environment variables
+    
+    Returns:
+        TTL integer (0 disables the execution cache)
+    """
+    return get_env_config().exec_cache_ttl
+
+def get_block_exec_cache_ttl() -> int:
+    """Get how long block agent results stay in the execution cache from environment variables
+    
+    Block agent runs write to Notion, so they get their own short TTL instead of EXEC_CACHE_TTL.
+    
+    Returns:
+        TTL integer in seconds (0 disables caching block agent results)
+    """
+    return get_env_config().block_exec_cache_ttl
+
+def get_agent_verbose() -> bool:
+    """Get whether agent executors print every step from environment variables
+    
+    Returns:
+        Verbose flag boolean
+    """
+    return get_env_config().agent_verbose
+
+def get_search_cache_ttl() -> int:
+    """Get how long Notion page search results are cached from environment variables
+    
+    Returns:
+        TTL integer in seconds (0 disables the search cache)
+    """
+    return get_env_config().search_cache_ttl
@@ -1,296 +1,202 @@
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain.agents import create_react_agent, AgentExecutor
-from langchain import hub
-from typing import Dict, Any
+from functools import lru_cache
+import asyncio
+import hashlib
+import orjson
+from collections import Counter, deque
+from langchain.agents import AgentExecutor
+from langchain.agents.format_scratchpad.tools import format_to_tool_messages
+from langchain.agents.output_parsers.tools import ToolsAgentOutputParser
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import Runnable, RunnablePassthrough
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-from service.tools.block_tool import (
-    # Core content blocks (unified: accept text or rich_text_array)
-    add_heading_tool,
-    add_paragraph_tool,
-    add_callout_tool,
-    add_quote_tool,
-    add_divider_tool,
-    add_toggle_tool,
-
-    # Code and lists
-    add_code_tool,
-    add_todo_tool,
-    add_bulleted_list_tool_obj,
-    add_numbered_list_tool_obj,
-
-    # Navigation and structure
-    add_table_of_contents_tool_obj,
-    add_breadcrumb_tool_obj,
-    add_equation_tool_obj,
-    add_table_tool_obj,
-
-    # Media blocks
-    add_image_tool,
-    add_video_tool,
-
-    # Web content
-    add_embed_tool,
-    add_url_tool,
-    add_bookmark_tool,
+from service.tools.block_tool import add_blocks_batch_tool, block_dedup_scope
+from service.llm.llm_client import get_chat_llm
+from service.llm.admission import llm_slot
+from config.env_config import (
+    get_agent_max_iters,
+    get_agent_max_sec,
+    get_agent_verbose,
+    get_block_exec_cache_ttl,
+    get_exec_cache_ttl,
+    get_openai_concurrency
 )
-from config.env_config import get_openai_api_key
+from service.cache.exec_cache import cached
 
-load_dotenv()
+# One parametric tool: every block type goes through add_blocks_batch, so each agent turn
+# carries a single tool schema instead of twenty. The single-block tools stay available
+# in service.tools.block_tool for other callers.
+BLOCK_TOOLS = [add_blocks_batch_tool]
 
+# Accepts text or rich_text_array for every text block type
+RICH_TEXT_TOOLS = [add_blocks_batch_tool]
 
-def _create_common_prompt_template() -> str:
-    """Create common prompt template to avoid duplication"""
-    return """You are an expert Notion content architect.
 
-CRITICAL RULES:
-1. NEVER send raw text without JSON wrapping
-2. ALWAYS include "page_id": "{page_id}" in every tool call
-3. Use double quotes for all JSON strings
-4. If a tool fails, DO NOT retry the same input - move to next content
-5. Create content systematically from top to bottom
-6. For images: Use Unsplash URLs (https://images.unsplash.com/...) or direct image URLs
-7. For videos: Use YouTube URLs (https://www.youtube.com/watch?v=...)
-8. SAFETY FIRST: If you encounter any errors, fall back to creating a Paragraph block
-
-CONTENT MAPPING:
-- Titles/Headlines → Add Heading Block
-- Body text → Add Paragraph Block  
-- Code examples → Add Code Block
-- Math formulas → Add Equation Block
-- Tasks → Add Todo Block
-- Lists → Add Bulleted List or Add Numbered List
-- Important notes → Add Callout Block
-- Quotes → Add Quote Block
-- Separators → Add Divider Block
-- Images → Add Image Block
-- Videos → Add Video Block
-- Links → Add URL Block or Add Bookmark Block
-- Tables → Add Table Block (extract dimensions from text)
-- Navigation → Add Table of Contents, Breadcrumb
-
-Execute content creation now using ONLY valid JSON format."""
+def _create_agent_prompt(instructions: str) -> ChatPromptTemplate:
+    """Create a tool-calling agent prompt with fixed system instructions and the per-request input"""
+    return ChatPromptTemplate.from_messages([
+        # A message object, not a template, so the JSON examples' braces are left alone
+        SystemMessage(content=instructions),
+        ("human", "{input}"),
+        MessagesPlaceholder("agent_scratchpad")
+    ])
 
 
-def call_block_agent(page_id: str, block_request: str) -> Dict[str, Any]:
+def _create_tool_calling_agent(model: str, tools: list, instructions: str) -> Runnable:
     """
-    Block agent that handles Notion block creation operations using LangChain tools
+    Create an agent that uses OpenAI native tool calling instead of ReAct text parsing
     
-    Args:
-        page_id: Target Notion page ID
-        block_request: Block creation request
-        
-    Returns:
-        Dictionary containing block creation results
+    Same shape as LangChain's create_tool_calling_agent, but with parallel tool calls
+    turned off: the async executor runs parallel calls concurrently, which could append
+    blocks out of order. Collapsing many blocks into one call is add_blocks_batch's job.
     """
-    
-    logger.info(f"✍️ Text agent called with page_id: '{page_id}', request: '{block_request[:100]}...'")
-    
-    # Initialize LLM
-    llm = ChatOpenAI(
-        temperature=0,
-        model="gpt-4o-mini",
-        api_key=get_openai_api_key()
+    llm_with_tools = get_chat_llm(model).bind_tools(tools, parallel_tool_calls=False)
+    return (
+        RunnablePassthrough.assign(agent_scratchpad=lambda x: format_to_tool_messages(x["intermediate_steps"]))
+        | _create_agent_prompt(instructions)
+        | llm_with_tools
+        | ToolsAgentOutputParser()
     )
-    
-    # Use standard ReAct prompt
-    react_prompt = hub.pull("hwchase17/react")
-    
-    # Create comprehensive block creation template with strict JSON enforcement
-    text_template = f"""{{_create_common_prompt_template()}}
-
-PAGE ID: {{page_id}}
-CONTENT REQUEST: {{block_request}}
-
-MANDATORY JSON FORMAT - ALL TOOLS REQUIRE VALID JSON INPUT:
-
-WRONG: "파이썬 기초 학습 가이드"
-CORRECT: {{"page_id": "{{page_id}}", "text": "파이썬 기초 학습 가이드", "level": 1}}
-
-TOOL SPECIFICATIONS:
-
-HEADING: {{"page_id": "{{page_id}}", "text": "title", "level": 1}}
-PARAGRAPH: {{"page_id": "{{page_id}}", "text": "content"}}
-CODE: {{"page_id": "{{page_id}}", "text": "code", "language": "python"}}
-EQUATION: {{"page_id": "{{page_id}}", "expression": "2 + 2 = 4"}}
-TODO: {{"page_id": "{{page_id}}", "text": "task", "checked": false}}
-BULLETED LIST: {{"page_id": "{{page_id}}", "text": "item"}}
-NUMBERED LIST: {{"page_id": "{{page_id}}", "text": "item"}}
-CALLOUT: {{"page_id": "{{page_id}}", "text": "note", "icon": "💡"}}
-QUOTE: {{"page_id": "{{page_id}}", "text": "quote"}}
-DIVIDER: {{"page_id": "{{page_id}}"}}
-TOGGLE: {{"page_id": "{{page_id}}", "text": "title"}}
-IMAGE: {{"page_id": "{{page_id}}", "image_url": "https://images.unsplash.com/photo-1506905925346-21bda4d32df4", "caption": ""}}
-VIDEO: {{"page_id": "{{page_id}}", "video_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "caption": ""}}
-EMBED: {{"page_id": "{{page_id}}", "embed_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "caption": ""}}
-URL: {{"page_id": "{{page_id}}", "url": "https://oracle.com/java", "title": "Oracle Java"}}
-BOOKMARK: {{"page_id": "{{page_id}}", "bookmark_url": "https://docs.oracle.com/javase", "caption": ""}}
-TABLE OF CONTENTS: {{"page_id": "{{page_id}}"}}
-BREADCRUMB: {{"page_id": "{{page_id}}"}}
-TABLE: {{"page_id": "{{page_id}}", "table_width": 3, "table_height": 3, "has_column_header": true, "has_row_header": false}}"""
-
-    # Define all tools from text_tool
-    tools = [
-        # Core content blocks
-        add_heading_tool,
-        add_paragraph_tool,
-        add_callout_tool,
-        add_quote_tool,
-        add_divider_tool,
-        add_toggle_tool,
-        
-        # Code and lists
-        add_code_tool,
-        add_todo_tool,
-        add_bulleted_list_tool_obj,
-        add_numbered_list_tool_obj,
-        
-        # Navigation and structure
-        add_table_of_contents_tool_obj,
-        add_breadcrumb_tool_obj,
-        add_equation_tool_obj,
-        add_table_tool_obj,
-        
-        # Media blocks
-        add_image_tool,
-        add_video_tool,
-        
-        # Web content
-        add_embed_tool,
-        add_url_tool,
-        add_bookmark_tool
-    ]
-    
-    # Create agent with standard ReAct prompt
-    agent = create_react_agent(llm=llm, tools=tools, prompt=react_prompt)
+
+
+@lru_cache(maxsize=1)
+def _get_block_agent_executor() -> AgentExecutor:
+    """Build the block agent executor once; only the input changes per request"""
+    agent = _create_tool_calling_agent("gpt-4o-mini", BLOCK_TOOLS, BLOCK_AGENT_STATIC_PROMPT)
     
     # Create agent executor with strict error handling
-    agent_executor = AgentExecutor(
+    return AgentExecutor(
         agent=agent,
-        tools=tools,
-        verbose=True,
-        max_iterations=50,  # Increased to 50 for more comprehensive content creation
-        max_execution_time=300,  # Increased timeout for more blocks (5 minutes)
-        return_intermediate_steps=True,
-        handle_parsing_errors=True,
-        early_stopping_method="force"  # Force stop on repeated failures
+        tools=BLOCK_TOOLS,
+        # AGENT_VERBOSE=1 prints every step; its stdout handler also hides tool runs from astream_events
+        verbose=get_agent_verbose(),
+        max_iterations=get_agent_max_iters(),  # Blocks are batched into one tool call; leaves room for fallbacks
+        max_execution_time=get_agent_max_sec(),  # Checked between steps; acall_* also enforce a hard limit
+        early_stopping_method="force"  # Tool-calling agents only support "force"
     )
-    
-    try:
-        # Create formatted input for the agent
-        formatted_input = text_template.format(
-            page_id=page_id,
-            block_request=block_request
-        )
-        
-        logger.info(f"🚀 Executing agent...")
-        
-        # Execute agent
-        result = agent_executor.invoke({"input": formatted_input})
-        
-        logger.info(f"🔧 Agent called {len(result.get('intermediate_steps', []))} tool(s)")
-        
-        # Check intermediate steps
-        intermediate_steps = result.get('intermediate_steps', [])
-        if len(intermediate_steps) >= 1:
-            return {
-                "success": True,
-                "message": f"Successfully created content using {len(intermediate_steps)} tools",
-                "page_id": page_id,
-                "tools_called": len(intermediate_steps),
-                "agent_output": result.get("output", "")
-            }
-        else:
-            return {
-                "success": False,
-                "error": "No tools were called",
-                "message": "Agent did not create any content"
-            }
-        
-    except Exception as e:
-        logger.error(f"❌ Text agent error: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e),
-            "message": f"Text agent failed: {str(e)}"
-        }
 
 
-def call_block_agent_with_rich_text(page_id: str, block_instructions: str, rich_text_array: list) -> Dict[str, Any]:
-    """
-    Block agent that processes rich text objects and creates formatted Notion blocks using ReAct pattern
-    
-    Args:
-        page_id: Target Notion page ID
-        block_instructions: Instructions for what type of blocks to create
-        rich_text_array: Array of formatted rich text objects from rich_text_llm
-        
-    Returns:
-        Dictionary containing block creation results
-    """
-    
-    logger.info(f"🎨 Rich text block agent called with page_id: '{page_id}', rich_text segments: {len(rich_text_array)}")
-    logger.info(f"📋 Block instructions: {block_instructions}")
-    
-    # Initialize LLM
-    llm = ChatOpenAI(
-        temperature=0,
-        model="gpt-4o",
-        api_key=get_openai_api_key()
-    )
-    
-    # Use standard ReAct prompt
-    react_prompt = hub.pull("hwchase17/react")
-    
-    # Create rich text processing template
-    rich_text_template = """You are an expert Notion block architect that processes formatted rich text objects into appropriate Notion blocks.
+# Rich text arrays up to this many segments, without complex formatting, go to gpt-4o-mini
+RICH_TEXT_SIMPLE_MAX_SEGMENTS = 20
 
-PAGE ID: {page_id}
-BLOCK INSTRUCTIONS: {block_instructions}
-RICH TEXT OBJECTS: {rich_text_array}
 
-YOUR TASK:
-1. Analyze the block_instructions to understand what type of content structure is needed
-2. Parse the provided rich_text_array CONTENT into logical sections (split by blank lines / headings / lists / markers)
-3. Map each section to the correct Notion block type and create the blocks in order
-4. Use Rich Text tools to preserve formatting (bold, italic, colors, etc.) for text blocks. NEVER replace with plain text.
+def _has_complex_formatting(rich_text_array: list) -> bool:
+    """Check for inline code, links, equations/mentions or more than one text color"""
+    colors = set()
+    for segment in rich_text_array:
+        if not isinstance(segment, dict):
+            continue
+        annotations = segment.get("annotations") or {}
+        text = segment.get("text") or {}
+        if segment.get("type", "text") != "text" or annotations.get("code") or text.get("link"):
+            return True
+        colors.add(annotations.get("color", "default"))
+    return len(colors - {"default"}) > 1
 
-AVAILABLE RICH TEXT TOOLS:
 
-ADD PARAGRAPH WITH RICH TEXT:
-{{"page_id": "{page_id}", "rich_text_array": [rich_text_objects]}}
+def select_rich_text_model(rich_text_array: list) -> str:
+    """Route plain, short rich text to gpt-4o-mini and escalate the rest to gpt-4o"""
+    if len(rich_text_array) > RICH_TEXT_SIMPLE_MAX_SEGMENTS or _has_complex_formatting(rich_text_array):
+        model = "gpt-4o"
+    else:
+        model = "gpt-4o-mini"
+    logger.info("🧭 Routing %d rich text segment(s) to %s", len(rich_text_array), model)
+    return model
 
-ADD HEADING WITH RICH TEXT:
-{{"page_id": "{page_id}", "rich_text_array": [rich_text_objects], "level": 1}}
 
-ADD CALLOUT WITH RICH TEXT:
-{{"page_id": "{page_id}", "rich_text_array": [rich_text_objects], "icon": "💡"}}
+@lru_cache(maxsize=2)
+def _get_rich_text_agent_executor(model: str = "gpt-4o") -> AgentExecutor:
+    """Build the rich text block agent executor once per model; only the input changes per request"""
+    agent = _create_tool_calling_agent(model, RICH_TEXT_TOOLS, RICH_TEXT_BLOCK_STATIC_PROMPT)
+    
+    return AgentExecutor(
+        agent=agent,
+        tools=RICH_TEXT_TOOLS,
+        verbose=get_agent_verbose(),
+        max_iterations=get_agent_max_iters(),
+        max_execution_time=get_agent_max_sec(),
+        early_stopping_method="force"
+    )
 
-ADD QUOTE WITH RICH TEXT:
-{{"page_id": "{page_id}", "rich_text_array": [rich_text_objects]}}
 
-ADD TODO WITH RICH TEXT:
-{{"page_id": "{page_id}", "rich_text_array": [rich_text_objects], "checked": false}}
+def _create_common_prompt_template() -> str:
+    """Create common prompt template to avoid duplication"""
+    return """You are an expert Notion content architect.
 
-ADD BULLETED LIST WITH RICH TEXT:
-{{"page_id": "{page_id}", "rich_text_array": [rich_text_objects]}}
+CRITICAL RULES:
+1. ALWAYS set "page_id" to the PAGE ID given in the request in every tool call
+2. If a tool fails, DO NOT retry the same input - move to next content
+3. Create content systematically from top to bottom - put ALL blocks, in order, into ONE add_blocks_batch call
+4. For images: Use Unsplash URLs (https://images.unsplash.com/...) or direct image URLs
+5. For videos: Use YouTube URLs (https://www.youtube.com/watch?v=...)
+6. SAFETY FIRST: If you encounter any errors, fall back to creating a paragraph block
+
+CONTENT MAPPING (block type):
+- Titles/Headlines → heading
+- Body text → paragraph
+- Code examples → code
+- Math formulas → equation
+- Tasks → todo
+- Lists → bulleted_list or numbered_list
+- Important notes → callout
+- Quotes → quote
+- Separators → divider
+- Images → image
+- Videos → video
+- Links → url or bookmark
+- Tables → table (extract dimensions from text)
+- Navigation → table_of_contents, breadcrumb"""
+
+
+# Static block agent instructions. They contain nothing page- or request-specific
+# and are sent as the system message, so the provider's automatic prompt caching
+# can reuse the prefill of this shared prefix across requests and agent steps.
+BLOCK_AGENT_STATIC_PROMPT = _create_common_prompt_template() + """
+
+BATCH EXAMPLE (add_blocks_batch arguments):
+{"page_id": "<PAGE_ID>", "blocks": [{"type": "heading", "text": "파이썬 기초 학습 가이드", "level": 1}, {"type": "paragraph", "text": "content"}, {"type": "divider"}]}
+
+BLOCK FIELD EXAMPLES:
+CODE: {"type": "code", "text": "code", "language": "python"}
+EQUATION: {"type": "equation", "expression": "2 + 2 = 4"}
+TODO: {"type": "todo", "text": "task", "checked": false}
+CALLOUT: {"type": "callout", "text": "note", "icon": "💡"}
+IMAGE: {"type": "image", "image_url": "https://images.unsplash.com/photo-1506905925346-21bda4d32df4", "caption": ""}
+VIDEO: {"type": "video", "video_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "caption": ""}
+URL: {"type": "url", "url": "https://oracle.com/java", "title": "Oracle Java"}
+BOOKMARK: {"type": "bookmark", "bookmark_url": "https://docs.oracle.com/javase", "caption": ""}
+TABLE: {"type": "table", "table_width": 3, "table_height": 3, "has_column_header": true, "has_row_header": false}"""
+
+
+def _format_block_agent_input(page_id: str, block_request: str) -> str:
+    """Build the per-request block agent input; the static instructions live in the system message"""
+    return f"PAGE ID: {page_id}\nCONTENT REQUEST: {block_request}"
+
+
+# Static rich text block agent instructions, sent as the system message; the page, block
+# instructions and rich text objects go in the human message so the shared prefix stays cacheable
+RICH_TEXT_BLOCK_STATIC_PROMPT = """You are an expert Notion block architect that processes formatted rich text objects into appropriate Notion blocks.
 
-ADD NUMBERED LIST WITH RICH TEXT:
-{{"page_id": "{page_id}", "rich_text_array": [rich_text_objects]}}
+YOUR TASK:
+1. Analyze the block_instructions to understand what type of content structure is needed
+2. Parse the provided rich_text_array CONTENT into logical sections (split by blank lines / headings / lists / markers)
+3. Map each section to the correct Notion block type and create the blocks in order
+4. Use rich_text_array fields to preserve formatting (bold, italic, colors, etc.) for text blocks. NEVER replace with plain text.
 
-ADD TABLE BLOCK:
-{{"page_id": "{page_id}", "table_width": 3, "table_height": 4, "has_column_header": true, "has_row_header": false}}
+TOOLS:
+add_blocks_batch (the only tool - create ALL blocks, in order, in ONE call), e.g.:
+{"page_id": "<PAGE_ID>", "blocks": [{"type": "heading", "rich_text_array": [rich_text_objects], "level": 1}, {"type": "paragraph", "rich_text_array": [rich_text_objects]}, {"type": "bulleted_list", "rich_text_array": [rich_text_objects]}]}
 
 RICH TEXT OBJECT FORMAT:
 Each rich_text object has:
 - "type": "text"
-- "text": {{"content": "text_content"}}
-- "annotations": {{"bold": true/false, "italic": true/false, "color": "red/blue/default", etc.}}
+- "text": {"content": "text_content"}
+- "annotations": {"bold": true/false, "italic": true/false, "color": "red/blue/default", etc.}
 
 STRATEGY (GENERIC, PATTERN-BASED):
 1. Sectioning: Split content by blank lines, headings, list markers ("- ", "* ", digit+"."), code fences, and standalone link/media lines.
@@ -300,7 +206,7 @@ STRATEGY (GENERIC, PATTERN-BASED):
 5. Quote: Quoted lines or well-known quotations → Quote.
 6. Lists: Consecutive lines with list markers → Bulleted/Numbered List (one item per line).
 7. Code: Text inside code fences (```...```) → Code block; apply language if specified.
-8. Lists (CRITICAL): Never send multiple list items in ONE tool call. Create ONE tool call PER ITEM. If the content chunk represents several items (by markers, newlines, commas, or separate phrases), split and call the list tool individually per item.
+8. Lists (CRITICAL): Never put multiple list items in ONE block. Create ONE list block PER ITEM. If the content chunk represents several items (by markers, newlines, commas, or separate phrases), split them into individual list blocks.
 9. Links/Media: SAFELY recognize URLs. If the line is primarily an image/video/embed/link → use Image/Video/Embed/URL/Bookmark blocks. IMPORTANT: Only extract URLs if they are clearly visible in the text content (e.g., "https://example.com"). If URL extraction fails or is unclear, keep as paragraph text with links preserved.
 10. Structure: Recognize generic navigation/separator intents from instructions context (e.g., table of contents, breadcrumb, divider) without relying on specific keywords.
 11. Equations: If an inline or block formula is detected (e.g., "Load Time = (File Size) / (Connection Speed)" or math-like expressions) and the intent suggests a formula, prefer Equation block over Paragraph.
@@ -309,14 +215,14 @@ STRATEGY (GENERIC, PATTERN-BASED):
 
 CRITICAL RULES:
 1. For TEXT blocks, use ONLY the provided rich_text_array content (do not invent new text)
-2. For NON-TEXT/STRUCTURAL blocks (images, videos, URLs, dividers, table of contents, breadcrumbs), you MAY extract URLs/markers from the text content and call the appropriate tools ONLY if the URLs are clearly visible and extractable
-3. ALWAYS include "page_id": "{page_id}" in every tool call
+2. For NON-TEXT/STRUCTURAL blocks (images, videos, URLs, dividers, table of contents, breadcrumbs), you MAY extract URLs/markers from the text content and add the matching blocks ONLY if the URLs are clearly visible and extractable
+3. ALWAYS include "page_id" set to the PAGE ID given below in every tool call
 4. Use appropriate block types based on block_instructions and detected patterns
 5. Preserve all formatting from rich_text_array for text sections
 6. Split large content into multiple blocks based on logical section boundaries; do not dump everything into one paragraph
 7. For table creation: Extract table dimensions from text (e.g., "4 rows, 3 columns" → table_width: 3, table_height: 4) and set has_column_header: true, has_row_header: false as defaults
 8. SAFETY FIRST: If you encounter any errors with URL extraction or media block creation, fall back to creating a Paragraph block with the rich text content instead
-9. TEXT BLOCKS MUST USE RICH TEXT: Always pass "rich_text_array" (not "text") to Heading/Paragraph/Callout/Quote/Todo/List/Code tools. Do not alter annotations or concatenate into plain strings.
+9. TEXT BLOCKS MUST USE RICH TEXT: Always give heading/paragraph/callout/quote/todo/list/code blocks a "rich_text_array" (not "text"). Do not alter annotations or concatenate into plain strings.
 
 TABLE CREATION INSTRUCTIONS:
 When creating tables, analyze the text content for:
@@ -327,86 +233,475 @@ When creating tables, analyze the text content for:
 
 EXAMPLE:
 If rich_text_array contains formatted text about "Java programming":
-{{"page_id": "{page_id}", "rich_text_array": {rich_text_array}}}
-
-Execute block creation now using the rich text objects."""
-    
-    # Unified tools: each accepts text or rich_text_array
-    rich_text_tools = [
-        add_heading_tool,
-        add_paragraph_tool,
-        add_callout_tool,
-        add_quote_tool,
-        add_todo_tool,
-        add_bulleted_list_tool_obj,
-        add_numbered_list_tool_obj,
-        add_code_tool,
-        add_divider_tool,
-        add_toggle_tool,
-        add_table_of_contents_tool_obj,
-        add_breadcrumb_tool_obj,
-        add_equation_tool_obj,
-        add_table_tool_obj,
-        add_image_tool,
-        add_video_tool,
-        add_embed_tool,
-        add_url_tool,
-        add_bookmark_tool
-    ]
-    
-    # Create agent with rich text tools
-    agent = create_react_agent(llm=llm, tools=rich_text_tools, prompt=react_prompt)
-    
-    # Create agent executor
-    agent_executor = AgentExecutor(
-        agent=agent,
-        tools=rich_text_tools,
-        verbose=True,
-        max_iterations=100,
-        max_execution_time=300,
-        return_intermediate_steps=True,
-        handle_parsing_errors=True,
-        early_stopping_method="force"
+{"page_id": "<PAGE_ID>", "blocks": [{"type": "paragraph", "rich_text_array": [rich_text_objects]}]}"""
+
+
+def format_rich_text_agent_input(page_id: str, block_instructions: str, rich_text_array: list) -> str:
+    """Build the per-request rich text block agent input; the static instructions live in the system message"""
+    return (
+        f"PAGE ID: {page_id}\n"
+        f"BLOCK INSTRUCTIONS: {block_instructions}\n"
+        # Valid JSON (not a Python repr) so the model can copy the objects into tool arguments as-is
+        f"RICH TEXT OBJECTS: {orjson.dumps(rich_text_array).decode()}\n\n"
+        "Execute block creation now using the rich text objects."
     )
+
+
+class ToolCallCounter(BaseCallbackHandler):
+    """Count tool calls and created blocks as the agent runs, instead of keeping every intermediate step"""
     
-    try:
-        # Create formatted input for the agent
-        formatted_input = rich_text_template.format(
-            page_id=page_id,
-            block_instructions=block_instructions,
-            rich_text_array=rich_text_array
-        )
+    # Update the counters on the calling thread rather than a worker thread
+    run_inline = True
+    
+    def __init__(self):
+        self.tools_called = 0
+        self.blocks_created = 0
+    
+    def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        self.tools_called += 1
+        try:
+            data = orjson.loads(output)
+        except (TypeError, ValueError):
+            return
+        # A batch call can create many blocks; a deduplicated batch created none this time
+        if isinstance(data, dict) and data.get("success") and not data.get("deduplicated"):
+            self.blocks_created += data.get("blocks_added", 1)
+
+
+class ToolLoopError(Exception):
+    """Raised when the agent keeps repeating a tool call that is not making progress"""
+
+
+class LoopDetector(BaseCallbackHandler):
+    """Stop a run that repeats the same tool call or keeps getting the same observation back"""
+    
+    MAX_REPEATS = 3
+    OBSERVATION_WINDOW = 5
+    
+    # Let ToolLoopError propagate out of the executor instead of being logged and ignored
+    raise_error = True
+    run_inline = True
+    
+    def __init__(self):
+        self.calls: Counter = Counter()
+        self.observations: deque = deque(maxlen=self.OBSERVATION_WINDOW)
+    
+    def on_agent_action(self, action: Any, **kwargs: Any) -> None:
+        # Dividers, breadcrumbs etc. take nothing but the page ID and may legitimately repeat
+        if isinstance(action.tool_input, dict) and action.tool_input.keys() <= {"page_id"}:
+            return
+        tool_input = orjson.dumps(action.tool_input, option=orjson.OPT_SORT_KEYS, default=str)
+        key = hashlib.blake2b(action.tool.encode() + tool_input, digest_size=16).digest()
+        self.calls[key] += 1
+        if self.calls[key] >= self.MAX_REPEATS:
+            raise ToolLoopError(f"{action.tool} called {self.MAX_REPEATS} times with the same input")
+    
+    def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        self.observations.append(str(output))
+        if len(self.observations) == self.OBSERVATION_WINDOW and len(set(self.observations)) == 1:
+            raise ToolLoopError(f"Last {self.OBSERVATION_WINDOW} tool calls returned the same result")
+
+
+def _summarize_block_agent_result(result: Dict[str, Any], counter: ToolCallCounter, page_id: str) -> Dict[str, Any]:
+    """Turn the block agent executor output into the response dictionary"""
+    logger.info("🔧 Agent called %d tool(s)", counter.tools_called)
+    
+    if counter.tools_called >= 1:
+        return {
+            "success": True,
+            "message": f"Successfully created content using {counter.tools_called} tools",
+            "page_id": page_id,
+            "tools_called": counter.tools_called,
+            "blocks_created": counter.blocks_created,
+            "agent_output": result.get("output", "")
+        }
+    else:
+        return {
+            "success": False,
+            "error": "No tools were called",
+            "message": "Agent did not create any content"
+        }
+
+
+def _agent_timeout_result(counter: ToolCallCounter, page_id: str) -> Dict[str, Any]:
+    """Build the response for a run cut off by the hard time limit, reporting the progress made so far"""
+    logger.warning("⏱️ Agent run exceeded %ds budget after %d tool(s)", get_agent_max_sec(), counter.tools_called)
+    return {
+        "success": False,
+        "status": "partial",
+        "error": "Agent run timed out",
+        "message": f"Agent stopped after {get_agent_max_sec()}s; created {counter.blocks_created} blocks before timing out",
+        "page_id": page_id,
+        "tools_called": counter.tools_called,
+        "blocks_created": counter.blocks_created
+    }
+
+
+def _agent_loop_result(counter: ToolCallCounter, page_id: str, error: ToolLoopError) -> Dict[str, Any]:
+    """Build the response for a run stopped by the loop detector, reporting the progress made so far"""
+    logger.warning("🔁 Agent stopped after %d tool(s): %s", counter.tools_called, error)
+    return {
+        "success": False,
+        "status": "partial",
+        "error": "Agent stopped repeating tool calls",
+        "message": f"{error}; created {counter.blocks_created} blocks before stopping",
+        "page_id": page_id,
+        "tools_called": counter.tools_called,
+        "blocks_created": counter.blocks_created
+    }
+
+
+def _hard_timeout() -> int:
+    """Hard limit for one async agent run: the executor's own budget plus a little grace for the step in flight"""
+    return get_agent_max_sec() + 5
+
+
+async def _astream_agent_events(executor: AgentExecutor, formatted_input: str, counter: ToolCallCounter) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run an agent executor and relay its tool calls as they happen
+    
+    Yields "tool_start" and "tool_end" events, then one "output" event carrying the raw
+    executor output. Raises TimeoutError once the hard time limit is exceeded.
+    """
+    events = executor.astream_events({"input": formatted_input}, config={"callbacks": [counter, LoopDetector()]}, version="v2")
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + _hard_timeout()
+    with block_dedup_scope():
+        try:
+            while True:
+                # Only the waits for the next event run under the deadline; a yield inside a timeout
+                # scope would hand the cancellation to the consumer as CancelledError, not TimeoutError
+                try:
+                    event = await asyncio.wait_for(anext(events), timeout=deadline - loop.time())
+                except StopAsyncIteration:
+                    return
+                kind = event["event"]
+                if kind == "on_tool_start":
+                    yield {"event": "tool_start", "tool": event["name"], "input": event["data"].get("input")}
+                elif kind == "on_tool_end":
+                    yield {"event": "tool_end", "tool": event["name"], "output": str(event["data"].get("output", ""))}
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    # Root run finished
+                    yield {"event": "output", "output": event["data"].get("output") or {}}
+        finally:
+            await events.aclose()
+
+
+def _block_agent_error(e: Exception) -> Dict[str, Any]:
+    """Build the block agent error response"""
+    logger.error("❌ Text agent error: %s", e)
+    return {
+        "success": False,
+        "error": str(e),
+        "message": f"Text agent failed: {str(e)}"
+    }
+
+
+# A run writes to Notion, so only runs that actually created blocks are reused, and only briefly
+# (BLOCK_EXEC_CACHE_TTL, capped by EXEC_CACHE_TTL): an immediate resend of the same request for
+# the same page is answered from the earlier run instead of appending the content twice
+_block_exec_cache = cached(
+    "block_agent",
+    key_fn=lambda page_id, block_request: [page_id, block_request],
+    ttl=lambda: min(get_exec_cache_ttl(), get_block_exec_cache_ttl()),
+    cache_if=lambda result: result.get("blocks_created", 0) > 0
+)
+
+
+@_block_exec_cache
+def call_block_agent(page_id: str, block_request: str) -> Dict[str, Any]:
+    """
+    Block agent that handles Notion block creation operations using LangChain tools
+    
+    Args:
+        page_id: Target Notion page ID
+        block_request: Block creation request
         
-        logger.info(f"🚀 Executing rich text block agent...")
+    Returns:
+        Dictionary containing block creation results
+    """
+    
+    logger.info("✍️ Text agent called with page_id: '%s', request: '%.100s...'", page_id, block_request)
+    
+    # Create formatted input for the agent
+    formatted_input = _format_block_agent_input(page_id, block_request)
+    
+    try:
+        logger.info("🚀 Executing agent...")
         
         # Execute agent
-        result = agent_executor.invoke({"input": formatted_input})
+        counter = ToolCallCounter()
+        with block_dedup_scope():
+            result = _get_block_agent_executor().invoke({"input": formatted_input}, config={"callbacks": [counter, LoopDetector()]})
+        return _summarize_block_agent_result(result, counter, page_id)
         
-        logger.info(f"🔧 Agent called {len(result.get('intermediate_steps', []))} tool(s)")
+    except ToolLoopError as e:
+        return _agent_loop_result(counter, page_id, e)
+    except Exception as e:
+        return _block_agent_error(e)
+
+
+@_block_exec_cache
+async def acall_block_agent(page_id: str, block_request: str) -> Dict[str, Any]:
+    """
+    Async variant of call_block_agent that awaits the agent instead of blocking the event loop
+    
+    Args:
+        page_id: Target Notion page ID
+        block_request: Block creation request
         
-        # Check intermediate steps
-        intermediate_steps = result.get('intermediate_steps', [])
-        if len(intermediate_steps) >= 1:
-            return {
-                "success": True,
-                "message": f"Successfully created {len(intermediate_steps)} formatted blocks from rich text objects",
-                "page_id": page_id,
-                "blocks_created": len(intermediate_steps),
-                "rich_text_segments_processed": len(rich_text_array),
-                "agent_output": result.get("output", ""),
-                "workflow": "rich_text_array → formatted_notion_blocks"
-            }
-        else:
-            return {
-                "success": False,
-                "error": "No blocks were created",
-                "message": "Agent did not create any formatted blocks from rich text objects"
-            }
+    Returns:
+        Dictionary containing block creation results
+    """
+    
+    logger.info("✍️ Text agent called with page_id: '%s', request: '%.100s...'", page_id, block_request)
+    
+    formatted_input = _format_block_agent_input(page_id, block_request)
+    
+    # Raises LLMBusyError (before any work) when the wait queue is full
+    async with llm_slot():
+        try:
+            logger.info("🚀 Executing agent...")
+            
+            counter = ToolCallCounter()
+            with block_dedup_scope():
+                result = await asyncio.wait_for(
+                    _get_block_agent_executor().ainvoke({"input": formatted_input}, config={"callbacks": [counter, LoopDetector()]}),
+                    timeout=_hard_timeout()
+                )
+            return _summarize_block_agent_result(result, counter, page_id)
+            
+        except TimeoutError:
+            return _agent_timeout_result(counter, page_id)
+        except ToolLoopError as e:
+            return _agent_loop_result(counter, page_id, e)
+        except Exception as e:
+            return _block_agent_error(e)
+
+
+async def astream_block_agent(page_id: str, block_request: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of call_block_agent that reports each tool call as it happens
+    
+    Args:
+        page_id: Target Notion page ID
+        block_request: Content request to convert into blocks
         
-    except Exception as e:
-        logger.error(f"❌ Rich text block agent error: {str(e)}")
+    Yields:
+        Progress events ("tool_start", "tool_end") followed by one "result" event
+        carrying the same dictionary call_block_agent returns
+    """
+    
+    logger.info("✍️ Text agent (streaming) called with page_id: '%s', request: '%.100s...'", page_id, block_request)
+    
+    formatted_input = _format_block_agent_input(page_id, block_request)
+    
+    # Raises LLMBusyError (before any work) when the wait queue is full
+    async with llm_slot():
+        try:
+            counter = ToolCallCounter()
+            async for event in _astream_agent_events(_get_block_agent_executor(), formatted_input, counter):
+                if event["event"] == "output":
+                    summary = _summarize_block_agent_result(event["output"], counter, page_id)
+                    yield {"event": "result", **summary}
+                else:
+                    yield event
+            
+        except TimeoutError:
+            yield {"event": "result", **_agent_timeout_result(counter, page_id)}
+        except ToolLoopError as e:
+            yield {"event": "result", **_agent_loop_result(counter, page_id, e)}
+        except Exception as e:
+            yield {"event": "result", **_block_agent_error(e)}
+
+
+async def acall_block_agent_batch(items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Run the block agent for many (page_id, block_request) pairs concurrently
+    
+    Different pages are processed in parallel, at most OPENAI_CONCURRENCY at a time so the
+    batch never overflows the LLM wait queue. Requests for the same page run one after
+    another in the given order, so their blocks are not interleaved on the page.
+    
+    Args:
+        items: (page_id, block_request) pairs
+        
+    Returns:
+        One result dictionary per item, in input order
+    """
+    
+    logger.info("📦 Block agent batch called with %d request(s)", len(items))
+    
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    by_page: Dict[str, List[int]] = {}
+    for index, (page_id, _) in enumerate(items):
+        by_page.setdefault(page_id, []).append(index)
+    
+    semaphore = asyncio.Semaphore(get_openai_concurrency())
+    
+    async def run_page(indexes: List[int]) -> None:
+        async with semaphore:
+            for index in indexes:
+                page_id, block_request = items[index]
+                results[index] = await acall_block_agent(page_id, block_request)
+    
+    await asyncio.gather(*(run_page(indexes) for indexes in by_page.values()))
+    return results
+
+
+def call_block_agent_batch(items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Sync wrapper around acall_block_agent_batch for callers without an event loop
+    
+    Args:
+        items: (page_id, block_request) pairs
+        
+    Returns:
+        One result dictionary per item, in input order
+    """
+    return asyncio.run(acall_block_agent_batch(items))
+
+
+def _summarize_rich_text_agent_result(result: Dict[str, Any], counter: ToolCallCounter, page_id: str, rich_text_array: list) -> Dict[str, Any]:
+    """Turn the rich text block agent executor output into the response dictionary"""
+    logger.info("🔧 Agent called %d tool(s)", counter.tools_called)
+    
+    if counter.tools_called >= 1:
+        blocks_created = counter.blocks_created
+        return {
+            "success": True,
+            "message": f"Successfully created {blocks_created} formatted blocks from rich text objects",
+            "page_id": page_id,
+            "blocks_created": blocks_created,
+            "tools_called": counter.tools_called,
+            "rich_text_segments_processed": len(rich_text_array),
+            "agent_output": result.get("output", ""),
+            "workflow": "rich_text_array → formatted_notion_blocks"
+        }
+    else:
         return {
             "success": False,
-            "error": str(e),
-            "message": f"Rich text block agent failed: {str(e)}"
+            "error": "No blocks were created",
+            "message": "Agent did not create any formatted blocks from rich text objects"
         }
+
+
+def _rich_text_agent_error(e: Exception) -> Dict[str, Any]:
+    """Build the rich text block agent error response"""
+    logger.error("❌ Rich text block agent error: %s", e)
+    return {
+        "success": False,
+        "error": str(e),
+        "message": f"Rich text block agent failed: {str(e)}"
+    }
+
+
+def call_block_agent_with_rich_text(page_id: str, block_instructions: str, rich_text_array: list) -> Dict[str, Any]:
+    """
+    Block agent that processes rich text objects and creates formatted Notion blocks using native tool calling
+    
+    Args:
+        page_id: Target Notion page ID
+        block_instructions: Instructions for what type of blocks to create
+        rich_text_array: Array of formatted rich text objects from rich_text_llm
+        
+    Returns:
+        Dictionary containing block creation results
+    """
+    
+    logger.info("🎨 Rich text block agent called with page_id: '%s', rich_text segments: %d", page_id, len(rich_text_array))
+    logger.info("📋 Block instructions: %s", block_instructions)
+    
+    # Create formatted input for the agent
+    formatted_input = format_rich_text_agent_input(page_id, block_instructions, rich_text_array)
+    
+    try:
+        logger.info("🚀 Executing rich text block agent...")
+        
+        # Execute agent
+        counter = ToolCallCounter()
+        with block_dedup_scope():
+            result = _get_rich_text_agent_executor(select_rich_text_model(rich_text_array)).invoke({"input": formatted_input}, config={"callbacks": [counter, LoopDetector()]})
+        return _summarize_rich_text_agent_result(result, counter, page_id, rich_text_array)
+        
+    except ToolLoopError as e:
+        return _agent_loop_result(counter, page_id, e)
+    except Exception as e:
+        return _rich_text_agent_error(e)
+
+
+async def acall_block_agent_with_rich_text(page_id: str, block_instructions: str, rich_text_array: list) -> Dict[str, Any]:
+    """
+    Async variant of call_block_agent_with_rich_text that awaits the agent instead of blocking the event loop
+    
+    Args:
+        page_id: Target Notion page ID
+        block_instructions: Instructions for what type of blocks to create
+        rich_text_array: Array of formatted rich text objects from rich_text_llm
+        
+    Returns:
+        Dictionary containing block creation results
+    """
+    
+    logger.info("🎨 Rich text block agent called with page_id: '%s', rich_text segments: %d", page_id, len(rich_text_array))
+    logger.info("📋 Block instructions: %s", block_instructions)
+    
+    formatted_input = format_rich_text_agent_input(page_id, block_instructions, rich_text_array)
+    
+    # Raises LLMBusyError (before any work) when the wait queue is full
+    async with llm_slot():
+        try:
+            logger.info("🚀 Executing rich text block agent...")
+            
+            counter = ToolCallCounter()
+            with block_dedup_scope():
+                result = await asyncio.wait_for(
+                    _get_rich_text_agent_executor(select_rich_text_model(rich_text_array)).ainvoke({"input": formatted_input}, config={"callbacks": [counter, LoopDetector()]}),
+                    timeout=_hard_timeout()
+                )
+            return _summarize_rich_text_agent_result(result, counter, page_id, rich_text_array)
+            
+        except TimeoutError:
+            return _agent_timeout_result(counter, page_id)
+        except ToolLoopError as e:
+            return _agent_loop_result(counter, page_id, e)
+        except Exception as e:
+            return _rich_text_agent_error(e)
+
+
+async def astream_block_agent_with_rich_text(page_id: str, block_instructions: str, rich_text_array: list) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of call_block_agent_with_rich_text that reports each tool call as it happens
+    
+    Args:
+        page_id: Target Notion page ID
+        block_instructions: Instructions for what type of blocks to create
+        rich_text_array: Array of formatted rich text objects from rich_text_llm
+        
+    Yields:
+        Progress events ("tool_start", "tool_end") followed by one "result" event
+        carrying the same dictionary call_block_agent_with_rich_text returns
+    """
+    
+    logger.info("🎨 Rich text block agent (streaming) called with page_id: '%s', rich_text segments: %d", page_id, len(rich_text_array))
+    
+    formatted_input = format_rich_text_agent_input(page_id, block_instructions, rich_text_array)
+    
+    # Raises LLMBusyError (before any work) when the wait queue is full
+    async with llm_slot():
+        try:
+            counter = ToolCallCounter()
+            executor = _get_rich_text_agent_executor(select_rich_text_model(rich_text_array))
+            async for event in _astream_agent_events(executor, formatted_input, counter):
+                if event["event"] == "output":
+                    summary = _summarize_rich_text_agent_result(event["output"], counter, page_id, rich_text_array)
+                    yield {"event": "result", **summary}
+                else:
+                    yield event
+            
+        except TimeoutError:
+            yield {"event": "result", **_agent_timeout_result(counter, page_id)}
+        except ToolLoopError as e:
+            yield {"event": "result", **_agent_loop_result(counter, page_id, e)}
+        except Exception as e:
+            yield {"event": "result", **_rich_text_agent_error(e)}
@@ -0,0 +1,149 @@
+from functools import lru_cache
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+from typing import Dict, Any
+import logging
+
+logger = logging.getLogger(__name__)
+
+from service.schemas.tool_schema import BlockPlan
+from service.tools.block_tool import aadd_notion_blocks_batch, add_notion_blocks_batch
+from service.llm.llm_client import get_chat_llm
+from service.llm.admission import llm_slot
+from service.agents.block_agent import (
+    RICH_TEXT_BLOCK_STATIC_PROMPT,
+    format_rich_text_agent_input,
+    select_rich_text_model,
+    acall_block_agent_with_rich_text,
+    call_block_agent_with_rich_text,
+)
+
+# Same sectioning and mapping rules as the rich text block agent, but the model answers
+# with the whole plan in one structured response instead of looping over tool calls
+BLOCK_PLANNER_STATIC_PROMPT = RICH_TEXT_BLOCK_STATIC_PROMPT + """
+
+PLANNING MODE:
+Do not call the block tools above. Return EVERY block for the page, in page order, as the BlockPlan.
+Each block takes the same fields as an add_blocks_batch block; page_id is not needed."""
+
+
+@lru_cache(maxsize=2)
+def _get_block_planner(model: str = "gpt-4o") -> Runnable:
+    """Build the planner chain once per model; only the input changes per request"""
+    prompt = ChatPromptTemplate.from_messages([
+        SystemMessage(content=BLOCK_PLANNER_STATIC_PROMPT),
+        ("human", "{input}")
+    ])
+    # Function calling (not strict JSON schema): rich text objects are free-form dicts
+    return prompt | get_chat_llm(model).with_structured_output(BlockPlan, method="function_calling")
+
+
+def _plan_specs(plan: BlockPlan) -> list:
+    """Turn the planned blocks into add_blocks_batch specs"""
+    return [block.model_dump(exclude_none=True) for block in plan.blocks]
+
+
+def _plan_result(page_id: str, result: Dict[str, Any], rich_text_array: list) -> Dict[str, Any]:
+    """Build the block planner response for an applied plan"""
+    blocks_created = len(result["results"])
+    
+    logger.info("🧩 Block plan applied: %d blocks", blocks_created)
+    return {
+        "success": True,
+        "message": f"Successfully created {blocks_created} formatted blocks from rich text objects",
+        "page_id": page_id,
+        "blocks_created": blocks_created,
+        "rich_text_segments_processed": len(rich_text_array),
+        "workflow": "rich_text_array → block_plan → formatted_notion_blocks"
+    }
+
+
+def _append_plan(page_id: str, plan: BlockPlan, rich_text_array: list) -> Dict[str, Any]:
+    """Append every planned block to the page in one batched write"""
+    return _plan_result(page_id, add_notion_blocks_batch(page_id, _plan_specs(plan)), rich_text_array)
+
+
+async def _aappend_plan(page_id: str, plan: BlockPlan, rich_text_array: list) -> Dict[str, Any]:
+    """Async variant of _append_plan that awaits the Notion write"""
+    return _plan_result(page_id, await aadd_notion_blocks_batch(page_id, _plan_specs(plan)), rich_text_array)
+
+
+def _block_planner_error(e: Exception) -> Dict[str, Any]:
+    """Build the block planner error response"""
+    logger.error("❌ Block planner error: %s", e)
+    return {
+        "success": False,
+        "error": str(e),
+        "message": f"Block planner failed: {str(e)}"
+    }
+
+
+def call_block_planner(page_id: str, block_instructions: str, rich_text_array: list) -> Dict[str, Any]:
+    """
+    Create formatted Notion blocks from rich text objects with ONE planning LLM call
+    
+    The planner returns every block at once, which is then appended in a single batched
+    write, instead of the agent's one-or-more LLM turns per tool call. If planning fails,
+    the rich text block agent is used instead.
+    
+    Args:
+        page_id: Target Notion page ID
+        block_instructions: Instructions for what type of blocks to create
+        rich_text_array: Array of formatted rich text objects from rich_text_llm
+        
+    Returns:
+        Dictionary containing block creation results (same shape as call_block_agent_with_rich_text)
+    """
+    
+    logger.info("🧩 Block planner called with page_id: '%s', rich_text segments: %d", page_id, len(rich_text_array))
+    
+    formatted_input = format_rich_text_agent_input(page_id, block_instructions, rich_text_array)
+    try:
+        plan: BlockPlan = _get_block_planner(select_rich_text_model(rich_text_array)).invoke({"input": formatted_input})
+        if not plan.blocks:
+            raise ValueError("Planner returned no blocks")
+    except Exception as e:
+        logger.warning("⚠️ Block planning failed (%s), falling back to the block agent", e)
+        return call_block_agent_with_rich_text(page_id, block_instructions, rich_text_array)
+    
+    try:
+        return _append_plan(page_id, plan, rich_text_array)
+    except Exception as e:
+        return _block_planner_error(e)
+
+
+async def acall_block_planner(page_id: str, block_instructions: str, rich_text_array: list) -> Dict[str, Any]:
+    """
+    Async variant of call_block_planner that awaits the planner instead of blocking the event loop
+    
+    Args:
+        page_id: Target Notion page ID
+        block_instructions: Instructions for what type of blocks to create
+        rich_text_array: Array of formatted rich text objects from rich_text_llm
+        
+    Returns:
+        Dictionary containing block creation results (same shape as call_block_agent_with_rich_text)
+    """
+    
+    logger.info("🧩 Block planner called with page_id: '%s', rich_text segments: %d", page_id, len(rich_text_array))
+    
+    formatted_input = format_rich_text_agent_input(page_id, block_instructions, rich_text_array)
+    # Raises LLMBusyError (before any work) when the wait queue is full
+    async with llm_slot():
+        try:
+            plan: BlockPlan = await _get_block_planner(select_rich_text_model(rich_text_array)).ainvoke({"input": formatted_input})
+            if not plan.blocks:
+                raise ValueError("Planner returned no blocks")
+        except Exception as e:
+            logger.warning("⚠️ Block planning failed (%s), falling back to the block agent", e)
+            plan = None
+    
+    # The agent takes its own LLM slot, so fall back only after releasing this one
+    if plan is None:
+        return await acall_block_agent_with_rich_text(page_id, block_instructions, rich_text_array)
+    
+    try:
+        return await _aappend_plan(page_id, plan, rich_text_array)
+    except Exception as e:
+        return _block_planner_error(e)
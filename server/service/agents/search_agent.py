@@ -1,18 +1,61 @@
-from dotenv import load_dotenv
 from langchain_core.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
-from langchain_core.tools import Tool
-from langchain.agents import create_react_agent, AgentExecutor
-from langchain import hub
-from langchain_core.output_parsers import PydanticOutputParser
-from typing import Dict, Any, List
-from langchain_core.runnables import RunnableLambda
-
-from service.tools.search_tool import search_notion_pages_tool
+from langchain_core.runnables import Runnable
+from functools import lru_cache
+import asyncio
+import logging
+
+from service.tools.search_tool import SEARCH_AGENT_CACHE_NAMESPACE, search_tool
 from service.schemas.search_schema import SearchResult
+from service.schemas.tool_schema import PageTitleQuery
+from service.llm.llm_client import get_chat_llm
+from service.llm.admission import llm_slot
+from service.cache.exec_cache import cached
+from config.env_config import get_exec_cache_ttl, get_search_cache_ttl, load_env_config
+
+logger = logging.getLogger(__name__)
+
+# No-op after the first import of config.env_config; .env is parsed once per process
+load_env_config()
+
+# Search request template, compiled once at import
+_SEARCH_TEMPLATE: PromptTemplate = PromptTemplate.from_template("""given the search request {search_request} i want you to find pages in Notion workspace.
+        Return the title of the page to search for, exactly as written in the request and without quotes.""")
+
+
+@lru_cache(maxsize=1)
+def _get_search_chain() -> Runnable:
+    """Build the search chain once; only the input changes per request
+    
+    The search tool is the only action the agent could take, so instead of a ReAct loop
+    the model answers once with the page title as structured output, and the tool's own
+    SearchResult is returned without being re-typed by the model and parsed again.
+    
+    Returns:
+        prompt | structured output model chain
+    """
+    return _SEARCH_TEMPLATE | get_chat_llm("gpt-4o-mini").with_structured_output(PageTitleQuery)
+
+
+def _finish_search(result: SearchResult) -> SearchResult:
+    """Report an empty search as "No pages found", as the agent's answer format did"""
+    if result.success and not result.data.pages:
+        return SearchResult(success=False, data=result.data, error="No pages found")
+    return result
 
-load_dotenv()
 
+# Searches are idempotent per query; answers live no longer than the search results they
+# came from (SEARCH_CACHE_TTL), and "No pages found" answers for a minute only
+_search_exec_cache = cached(
+    SEARCH_AGENT_CACHE_NAMESPACE,
+    key_fn=lambda search_request: search_request,
+    negative_ttl=60,
+    encode=lambda result: result.model_dump_json(),
+    decode=SearchResult.model_validate_json,
+    ttl=lambda: min(get_exec_cache_ttl(), get_search_cache_ttl())
+)
+
+
+@_search_exec_cache
 def call_search_agent(search_request: str) -> SearchResult:
     """
     Search agent that handles Notion search operations and returns page information
@@ -23,72 +66,29 @@ def call_search_agent(search_request: str) -> SearchResult:
     Returns:
         SearchResult: Pydantic model containing search results
     """
-    
-    llm: ChatOpenAI = ChatOpenAI(
-        temperature=0,
-        model="gpt-4o-mini"
-    )
-    
-    # Use standard ReAct prompt
-    react_prompt = hub.pull("hwchase17/react")
-    
-    # Custom template for search request
-    search_template: str = """given the search request {search_request} i want you to find pages in Notion workspace.
-        Your answer must contain only the search results data in JSON format with this exact structure:
-        {{
-            "success": true,
-            "data": {{
-                "pages": [
-                    {{
-                        "id": "page_id",
-                        "title": "page_title", 
-                        "url": "page_url",
-                        "created_time": "created_time",
-                        "last_edited_time": "last_edited_time"
-                    }}
-                ],
-                "total_found": number_of_pages
-            }},
-            "error": ""
-        }}
-        
-        If no pages found, return:
-        {{
-            "success": false,
-            "data": {{
-                "pages": [],
-                "total_found": 0
-            }},
-            "error": "No pages found"
-        }}"""
-    
-    prompt_template: PromptTemplate = PromptTemplate(
-        template=search_template, 
-        input_variables=["search_request"]
-    )
+    query: PageTitleQuery = _get_search_chain().invoke({"search_request": search_request})
+    result: SearchResult = _finish_search(search_tool(query.page_title))
 
-    tools_for_agent: List[Tool] = [search_notion_pages_tool]
-    
-    # Create agent with standard ReAct prompt
-    agent = create_react_agent(llm=llm, tools=tools_for_agent, prompt=react_prompt)
-    
-    agent_executor: AgentExecutor = AgentExecutor(
-        agent=agent, 
-        tools=tools_for_agent, 
-        verbose=True, 
-        handle_parsing_errors=True
-    )
-    
-    # Create parser for SearchResult
-    search_result_parser: PydanticOutputParser[SearchResult] = PydanticOutputParser(pydantic_object=SearchResult)
-    
-    # Create chain: agent_executor | search_result_parser
-    extract_output: RunnableLambda = RunnableLambda(lambda d: d["output"])
-    chain = agent_executor | extract_output | search_result_parser
+    logger.debug("result: %s", result)
+    logger.info("✅ Search agent created and executed successfully")
+    return result
+
+
+@_search_exec_cache
+async def acall_search_agent(search_request: str) -> SearchResult:
+    """
+    Async variant of call_search_agent that awaits the agent instead of blocking the event loop
     
-    formatted_prompt: str = prompt_template.format(search_request=search_request)
-    result: SearchResult = chain.invoke({"input": formatted_prompt})
+    Args:
+        search_request: Search query string
+        
+    Returns:
+        SearchResult: Pydantic model containing search results
+    """
+    async with llm_slot():
+        query: PageTitleQuery = await _get_search_chain().ainvoke({"search_request": search_request})
+    result: SearchResult = _finish_search(await asyncio.to_thread(search_tool, query.page_title))
 
-    print("result: ", result)
-    print("✅ Search agent created and executed successfully")
+    logger.debug("result: %s", result)
+    logger.info("✅ Search agent created and executed successfully")
     return result 
\ No newline at end of file
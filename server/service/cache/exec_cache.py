@@ -0,0 +1,171 @@
+# Persistent execution cache for agent calls
+import asyncio
+import hashlib
+import inspect
+import logging
+import orjson
+import sqlite3
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Optional
+from config.env_config import get_database_url, get_exec_cache_ttl
+
+logger = logging.getLogger(__name__)
+
+_connection: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+
+
+def _get_connection() -> sqlite3.Connection:
+    """Open the cache database from DATABASE_URL (sqlite:///path) on first use"""
+    global _connection
+    if _connection is None:
+        path = get_database_url().removeprefix("sqlite:///")
+        connection = sqlite3.connect(path, check_same_thread=False)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS exec_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        _connection = connection
+    return _connection
+
+
+def make_key(namespace: str, *parts: Any) -> str:
+    """Content-address a call: blake2b over the JSON-encoded key parts, prefixed with the namespace"""
+    payload = orjson.dumps([namespace, *parts], option=orjson.OPT_SORT_KEYS)
+    return f"{namespace}:{hashlib.blake2b(payload, digest_size=16).hexdigest()}"
+
+
+# The cache is an optimization: a database error (locked by another worker, read-only
+# directory, unusable DATABASE_URL) is logged and treated as a miss or a skipped write,
+# never raised into the agent call
+
+def get(key: str) -> Optional[str]:
+    """Return the stored value, or None if it is missing, expired or unreadable"""
+    try:
+        with _lock:
+            row = _get_connection().execute(
+                "SELECT value FROM exec_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning("⚠️ Execution cache read failed, treating as a miss: %s", e)
+        return None
+    return row[0] if row else None
+
+
+def _write(sql: str, parameters: tuple) -> None:
+    """Run one write statement and commit it; on failure roll back so no lock is left held"""
+    with _lock:
+        try:
+            connection = _get_connection()
+            connection.execute(sql, parameters)
+            connection.commit()
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Execution cache write skipped: %s", e)
+            if _connection is not None:
+                try:
+                    _connection.rollback()
+                except sqlite3.Error:
+                    pass
+
+
+def put(key: str, value: str, ttl: float) -> None:
+    """Store a value for ttl seconds"""
+    _write(
+        "INSERT OR REPLACE INTO exec_cache (key, value, expires_at) VALUES (?, ?, ?)",
+        (key, value, time.time() + ttl)
+    )
+
+
+def clear(namespace: str) -> None:
+    """Drop every stored value in a namespace"""
+    _write("DELETE FROM exec_cache WHERE key LIKE ?", (f"{namespace}:%",))
+
+
+def _dumps(value: Any) -> str:
+    """Default result encoder: orjson, as text for the TEXT column"""
+    return orjson.dumps(value).decode()
+
+
+def _is_failure(result: Any) -> bool:
+    """Treat dict results and result models with success=False as negative results"""
+    success = result.get("success") if isinstance(result, dict) else getattr(result, "success", True)
+    return success is False
+
+
+def cached(
+    namespace: str,
+    key_fn: Callable[..., Any],
+    negative_ttl: float = 0,
+    encode: Callable[[Any], str] = _dumps,
+    decode: Callable[[str], Any] = orjson.loads,
+    ttl: Callable[[], float] = get_exec_cache_ttl,
+    cache_if: Callable[[Any], bool] = lambda result: True
+):
+    """
+    Cache a sync or async function's results on disk, keyed on the call's content.
+
+    Successful results accepted by cache_if are kept for ttl() seconds (EXEC_CACHE_TTL by
+    default; 0 or less disables the cache). Failed results (success=False) are kept for
+    negative_ttl seconds, so a repeated failing call is not re-run at once; with the default
+    of 0 they are not cached at all. Async functions do the SQLite reads and writes in a
+    worker thread, off the event loop.
+
+    Args:
+        namespace (str): Cache namespace, usually the function name
+        key_fn (Callable): Receives the call's arguments and returns the key parts
+        negative_ttl (float): Seconds to keep failed results
+        encode (Callable): Result to string
+        decode (Callable): String back to result
+        ttl (Callable): Returns the seconds to keep successful results, read on every call
+        cache_if (Callable): Whether a successful result may be cached
+
+    Returns:
+        Callable: Decorator
+    """
+    def lookup(args, kwargs):
+        key = make_key(namespace, key_fn(*args, **kwargs))
+        value = get(key)
+        if value is not None:
+            logger.info("♻️ %s execution cache hit", namespace)
+            return key, decode(value)
+        return key, None
+
+    def store(key, result) -> None:
+        if _is_failure(result):
+            seconds = negative_ttl
+        elif cache_if(result):
+            seconds = ttl()
+        else:
+            return
+        if seconds > 0:
+            put(key, encode(result), seconds)
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if ttl() <= 0:
+                    return await func(*args, **kwargs)
+                # sqlite3 blocks (put() commits), so keep it off the event loop
+                key, hit = await asyncio.to_thread(lookup, args, kwargs)
+                if hit is not None:
+                    return hit
+                result = await func(*args, **kwargs)
+                await asyncio.to_thread(store, key, result)
+                return result
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if ttl() <= 0:
+                return func(*args, **kwargs)
+            key, hit = lookup(args, kwargs)
+            if hit is not None:
+                return hit
+            result = func(*args, **kwargs)
+            store(key, result)
+            return result
+        return wrapper
+
+    return decorator
@@ -0,0 +1,46 @@
+# Admission control for LLM-bound work
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from config.env_config import get_openai_concurrency, get_openai_queue_size
+
+
+class LLMBusyError(Exception):
+    """Raised when too many agent runs are already running or waiting for an LLM slot"""
+
+
+_semaphore: Optional[asyncio.Semaphore] = None
+_pending: int = 0
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Create the shared semaphore on first use"""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(get_openai_concurrency())
+    return _semaphore
+
+
+@asynccontextmanager
+async def llm_slot() -> AsyncIterator[None]:
+    """
+    Hold one of the OPENAI_CONCURRENCY slots while talking to the LLM.
+
+    Callers beyond the running slots wait in line; once OPENAI_QUEUE_SIZE callers are
+    already waiting, new callers are rejected immediately instead of piling up behind
+    OpenAI rate limits.
+
+    Raises:
+        LLMBusyError: If the wait queue is full
+    """
+    global _pending
+    semaphore = _get_semaphore()
+    if semaphore.locked() and _pending - get_openai_concurrency() >= get_openai_queue_size():
+        raise LLMBusyError("Too many concurrent agent requests, try again later")
+
+    _pending += 1
+    try:
+        async with semaphore:
+            yield
+    finally:
+        _pending -= 1
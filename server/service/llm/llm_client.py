@@ -0,0 +1,38 @@
+# Shared chat model clients
+from functools import lru_cache
+from typing import TYPE_CHECKING
+from config.env_config import get_openai_api_key
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+
+# Fixed sampling seed: with temperature 0, repeated prompts get the same completion as far
+# as OpenAI allows, so cached and fresh results agree
+LLM_SEED = 42
+
+
+@lru_cache(maxsize=None)
+def get_chat_llm(model: str = "gpt-4o", temperature: float = 0) -> "ChatOpenAI":
+    """
+    Get a shared ChatOpenAI client for the given model and temperature.
+
+    Clients are built once per (model, temperature) pair and reused, so the
+    underlying HTTP connection pool is shared across requests.
+
+    Args:
+        model (str): OpenAI model name
+        temperature (float): Sampling temperature
+
+    Returns:
+        ChatOpenAI: Cached chat model client
+    """
+    # Imported on first use: langchain_openai pulls in the whole openai SDK (~1s cold)
+    from langchain_openai import ChatOpenAI
+    
+    return ChatOpenAI(
+        temperature=temperature,
+        model=model,
+        seed=LLM_SEED,
+        api_key=get_openai_api_key()
+    )
@@ -1,48 +1,16 @@
-import json
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import asyncio
+import orjson
 import re
-from typing import Dict, Any
-from langchain_openai import ChatOpenAI
-from config.env_config import get_openai_api_key
+from service.llm.llm_client import get_chat_llm
+from service.parser import extract_json, iter_json_array_items
+from service.schemas.text_schema import RICH_TEXT_ARRAY_ADAPTER, RICH_TEXT_ITEM_ADAPTER
+from service.rich_text_rules import DEFAULT_ANNOTATIONS, GENERIC_STYLE_WORDS, STYLE_KEYWORDS, build_rich_text_array
 
 
-def create_formatted_rich_text_array(format_instructions: str, result_text: str) -> Dict[str, Any]:
-    """
-    Create formatted rich text array by applying multiple format instructions to result text.
-    
-    Args:
-        format_instructions (str): Multiple format instructions separated by sentences
-                                 (e.g., "중요한 부분을 빨간색으로 칠해줘. 자바를 굵게 만들어줘. 프로그래밍을 밑줄 쳐줘.")
-        result_text (str): The actual text content to be formatted
-        
-    Returns:
-        Dict[str, Any]: Formatted rich text result with array of rich text objects
-    """
-    try:
-        # If no format instructions, return plain text
-        if not format_instructions.strip():
-            plain_rich_text = [{
-                "type": "text",
-                "text": {"content": result_text},
-                "annotations": {
-                    "bold": False,
-                    "italic": False,
-                    "strikethrough": False,
-                    "underline": False,
-                    "code": False,
-                    "color": "default"
-                }
-            }]
-            return {
-                "success": True,
-                "rich_text_array": plain_rich_text,
-                "message": "Plain text without formatting created.",
-                "segments_count": 1
-            }
-        
-        # Use LLM to analyze format instructions and apply to text
-        llm = ChatOpenAI(temperature=0, model="gpt-4o", api_key=get_openai_api_key())
-        
-        system_prompt = """You are a text formatting expert. Analyze MULTIPLE format instructions and apply them to specific parts of text.
+# Formatting instructions, kept byte-identical across requests so OpenAI's automatic
+# prompt caching can reuse the prefix; only the instructions and text are appended per call
+RICH_TEXT_SYSTEM_PROMPT = """You are a text formatting expert. Analyze MULTIPLE format instructions and apply them to specific parts of text.
 
 FORMAT MAPPING:
 - "빨간색", "red" → color: "red"
@@ -174,65 +142,304 @@ Output:
 
 Return ONLY the JSON array."""
 
-        prompt = f"""{system_prompt}
+
+# Style keywords from the FORMAT MAPPING above, plus generic color/emphasis words. Instructions
+# without any of them (empty, table- or structure-only) are returned as plain text with no LLM call
+_FORMAT_KEYWORDS = frozenset(STYLE_KEYWORDS) | GENERIC_STYLE_WORDS
+_FORMAT_RE = re.compile("|".join(map(re.escape, sorted(_FORMAT_KEYWORDS))), re.IGNORECASE)
+
+
+def _has_style_keyword(format_instructions: str) -> bool:
+    """Check whether the instructions ask for any styling the LLM would apply"""
+    return _FORMAT_RE.search(format_instructions) is not None
+
+
+def _plain_rich_text(result_text: str) -> list:
+    """Wrap the text in a single unformatted rich text object (annotations are shared, never mutate them)"""
+    return [{"type": "text", "text": {"content": result_text}, "annotations": DEFAULT_ANNOTATIONS}]
+
+
+def _plain_text_result(format_instructions: str, result_text: str) -> Dict[str, Any]:
+    """Result for text without style instructions, which needs no LLM call"""
+    message = "Plain text without formatting created." if not format_instructions.strip() else "No style keywords found, plain text created."
+    return {
+        "success": True,
+        "rich_text_array": _plain_rich_text(result_text),
+        "message": message,
+        "segments_count": 1
+    }
+
+
+def _format_prompt(format_instructions: str, result_text: str) -> str:
+    """Build the per-request prompt; the shared system prompt stays the prefix"""
+    return f"""{RICH_TEXT_SYSTEM_PROMPT}
 
 Format Instructions: {format_instructions}
 Text Content: {result_text}
 
 Output:"""
 
-        response = llm.invoke(prompt)
-        raw_text = getattr(response, "content", "") if not isinstance(response, str) else response
-        
-        # Clean and parse response
-        cleaned = raw_text.strip()
-        if cleaned.startswith("```"):
-            cleaned = re.sub(r"^```[a-zA-Z0-9_-]*\n", "", cleaned)
-            cleaned = re.sub(r"\n```$", "", cleaned)
-        
-        rich_text_array = json.loads(cleaned.strip())
-        
-        # Validate response format
-        if not isinstance(rich_text_array, list):
-            raise ValueError("Invalid response format - expected array")
-        
+
+def _formatted_result(response: Any, format_instructions: str, result_text: str) -> Dict[str, Any]:
+    """Parse the LLM response into the formatted result (raises ValueError if it holds no array)"""
+    raw_text = getattr(response, "content", "") if not isinstance(response, str) else response
+    
+    # Parse the JSON array, skipping any code fence or surrounding text, and validate
+    # its structure (pydantic's ValidationError is a ValueError)
+    rich_text_array = RICH_TEXT_ARRAY_ADAPTER.validate_python(extract_json(raw_text, "["))
+    
+    return _array_result(rich_text_array, format_instructions, result_text)
+
+
+def _array_result(rich_text_array: list, format_instructions: str, result_text: str) -> Dict[str, Any]:
+    """Build the success result for a formatted rich text array"""
+    return {
+        "success": True,
+        "rich_text_array": rich_text_array,
+        "message": f"Formatted rich text array created with {len(rich_text_array)} segments.",
+        "segments_count": len(rich_text_array),
+        "format_instructions": format_instructions,
+        "result_text": result_text
+    }
+
+
+def _rule_based_result(format_instructions: str, result_text: str) -> Optional[Dict[str, Any]]:
+    """Format with the local rules, or return None when the instructions need the model"""
+    rich_text_array = build_rich_text_array(format_instructions, result_text)
+    if rich_text_array is None:
+        return None
+    return {**_array_result(rich_text_array, format_instructions, result_text), "rule_based": True}
+
+
+def _fallback_result(e: Exception, format_instructions: str, result_text: str) -> Dict[str, Any]:
+    """Return the text unformatted when formatting failed"""
+    try:
         return {
             "success": True,
-            "rich_text_array": rich_text_array,
-            "message": f"Formatted rich text array created with {len(rich_text_array)} segments.",
-            "segments_count": len(rich_text_array),
+            "rich_text_array": _plain_rich_text(result_text),
+            "message": f"Formatting failed, returned plain text. Error: {str(e)}",
+            "segments_count": 1,
+            "fallback": True,
             "format_instructions": format_instructions,
             "result_text": result_text
         }
+    except Exception:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": "Critical error in rich text formatting"
+        }
+
+
+def create_formatted_rich_text_array(format_instructions: str, result_text: str) -> Dict[str, Any]:
+    """
+    Create formatted rich text array by applying multiple format instructions to result text.
+    
+    Args:
+        format_instructions (str): Multiple format instructions separated by sentences
+                                 (e.g., "중요한 부분을 빨간색으로 칠해줘. 자바를 굵게 만들어줘. 프로그래밍을 밑줄 쳐줘.")
+        result_text (str): The actual text content to be formatted
         
+    Returns:
+        Dict[str, Any]: Formatted rich text result with array of rich text objects
+    """
+    # If no style is requested, return plain text
+    if not _has_style_keyword(format_instructions):
+        return _plain_text_result(format_instructions, result_text)
+    
+    # Explicit "phrase → style" instructions are applied locally, without the LLM
+    rule_result = _rule_based_result(format_instructions, result_text)
+    if rule_result is not None:
+        return rule_result
+    
+    try:
+        # Use LLM to analyze format instructions and apply to text
+        response = get_chat_llm("gpt-4o").invoke(_format_prompt(format_instructions, result_text))
+        return _formatted_result(response, format_instructions, result_text)
     except Exception as e:
-        # Return plain text as fallback
+        return _fallback_result(e, format_instructions, result_text)
+
+
+async def acreate_formatted_rich_text_array(format_instructions: str, result_text: str) -> Dict[str, Any]:
+    """
+    Async variant of create_formatted_rich_text_array that awaits the LLM instead of blocking the event loop.
+    
+    Args:
+        format_instructions (str): Multiple format instructions separated by sentences
+        result_text (str): The actual text content to be formatted
+        
+    Returns:
+        Dict[str, Any]: Formatted rich text result with array of rich text objects
+    """
+    if not _has_style_keyword(format_instructions):
+        return _plain_text_result(format_instructions, result_text)
+    
+    rule_result = _rule_based_result(format_instructions, result_text)
+    if rule_result is not None:
+        return rule_result
+    
+    try:
+        response = await get_chat_llm("gpt-4o").ainvoke(_format_prompt(format_instructions, result_text))
+        return _formatted_result(response, format_instructions, result_text)
+    except Exception as e:
+        return _fallback_result(e, format_instructions, result_text)
+
+
+def iter_formatted_rich_text(format_instructions: str, result_text: str) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of create_formatted_rich_text_array that yields rich text objects one by one.
+    
+    The LLM response is streamed and each rich text object is yielded as soon as it is complete,
+    so callers can start appending blocks before the model has finished. If formatting fails,
+    the part of the text not yet yielded is returned unformatted.
+    
+    Args:
+        format_instructions (str): Multiple format instructions separated by sentences
+        result_text (str): The actual text content to be formatted
+        
+    Yields:
+        Dict[str, Any]: Rich text objects, in text order
+    """
+    if not _has_style_keyword(format_instructions):
+        yield from _plain_rich_text(result_text)
+        return
+    
+    rule_result = _rule_based_result(format_instructions, result_text)
+    if rule_result is not None:
+        yield from rule_result["rich_text_array"]
+        return
+    
+    emitted = ""
+    try:
+        chunks = (chunk.content for chunk in get_chat_llm("gpt-4o").stream(_format_prompt(format_instructions, result_text)))
+        for item in iter_json_array_items(chunks):
+            rich_text = RICH_TEXT_ITEM_ADAPTER.validate_python(item)
+            yield rich_text
+            emitted += rich_text["text"]["content"]
+    except Exception:
+        # Fall back to the unformatted remainder when the yielded segments are a prefix of the text
+        remainder = result_text[len(emitted):] if result_text.startswith(emitted) else ""
+        if remainder or not emitted:
+            yield from _plain_rich_text(remainder if emitted else result_text)
+
+
+# Default number of formatting calls in flight at once for acreate_formatted_rich_text_arrays_concurrently
+RICH_TEXT_CONCURRENCY = 16
+
+
+async def acreate_formatted_rich_text_arrays_concurrently(
+    pairs: List[Tuple[str, str]],
+    concurrency: int = RICH_TEXT_CONCURRENCY
+) -> List[Dict[str, Any]]:
+    """
+    Format many texts with one LLM call each, at most `concurrency` of them in flight.
+    
+    For callers that cannot use the batched prompt of create_formatted_rich_text_arrays.
+    Rate-limited (429) calls are retried with backoff by the OpenAI client, which honors Retry-After.
+    
+    Args:
+        pairs (List[Tuple[str, str]]): (format_instructions, result_text) pairs
+        concurrency (int): Max calls in flight
+        
+    Returns:
+        List[Dict[str, Any]]: Results in input order
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def format_one(format_instructions: str, result_text: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await acreate_formatted_rich_text_array(format_instructions, result_text)
+    
+    return await asyncio.gather(*(format_one(*pair) for pair in pairs))
+
+
+# Pairs formatted per batched LLM call; larger prompts start to cost more latency than they save
+RICH_TEXT_BATCH_SIZE = 8
+
+
+def _format_batch_prompt(pairs: List[Tuple[str, str]]) -> str:
+    """Build one prompt asking for a rich text array per numbered (format_instructions, result_text) pair"""
+    numbered_inputs = orjson.dumps(
+        [
+            {"index": i, "format_instructions": format_instructions, "text_content": result_text}
+            for i, (format_instructions, result_text) in enumerate(pairs)
+        ]
+    ).decode()
+    return f"""{RICH_TEXT_SYSTEM_PROMPT}
+
+BATCH MODE: You will receive {len(pairs)} numbered inputs, each with its own format instructions and text content.
+Format each input independently. Return ONLY a JSON array with exactly {len(pairs)} objects, in input order:
+[{{"index": 0, "rich_text_array": [rich_text_objects]}}, ...]
+
+Inputs:
+{numbered_inputs}
+
+Output:"""
+
+
+def _parse_batch_response(raw_text: str, size: int) -> Dict[int, list]:
+    """Map each valid index in a batched response to its rich text array"""
+    items = extract_json(raw_text, "[")
+    if not isinstance(items, list):
+        raise ValueError("Invalid batch response format - expected array")
+    
+    arrays: Dict[int, list] = {}
+    for item in items:
+        if not isinstance(item, dict) or item.get("index") not in range(size):
+            continue
         try:
-            plain_rich_text = [{
-                "type": "text",
-                "text": {"content": result_text},
-                "annotations": {
-                    "bold": False,
-                    "italic": False,
-                    "strikethrough": False,
-                    "underline": False,
-                    "code": False,
-                    "color": "default"
-                }
-            }]
+            arrays[item["index"]] = RICH_TEXT_ARRAY_ADAPTER.validate_python(item.get("rich_text_array"))
+        except ValueError:
+            continue
+    return arrays
+
+
+def create_formatted_rich_text_arrays(pairs: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Batched create_formatted_rich_text_array: formats many texts with few LLM calls.
+    
+    Pairs are sent RICH_TEXT_BATCH_SIZE at a time in one numbered prompt each, and the
+    chunk prompts run concurrently through llm.batch. Pairs without style instructions, or
+    with explicit ones the local rules handle, need no LLM call, and any pair missing from
+    (or unparseable in) a batched response falls back to its own create_formatted_rich_text_array call.
+    
+    Args:
+        pairs (List[Tuple[str, str]]): (format_instructions, result_text) pairs
+        
+    Returns:
+        List[Dict[str, Any]]: Results in input order (same shape as create_formatted_rich_text_array)
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(pairs)
+    pending: List[int] = []
+    for i, (format_instructions, result_text) in enumerate(pairs):
+        if not _has_style_keyword(format_instructions):
+            # Plain text needs no LLM call
+            results[i] = _plain_text_result(format_instructions, result_text)
+            continue
+        results[i] = _rule_based_result(format_instructions, result_text)
+        if results[i] is None:
+            pending.append(i)
+    
+    chunks = [pending[start:start + RICH_TEXT_BATCH_SIZE] for start in range(0, len(pending), RICH_TEXT_BATCH_SIZE)]
+    if chunks:
+        responses = get_chat_llm("gpt-4o").batch(
+            [_format_batch_prompt([pairs[i] for i in chunk]) for chunk in chunks],
+            return_exceptions=True
+        )
+        for chunk, response in zip(chunks, responses):
+            try:
+                if isinstance(response, Exception):
+                    raise response
+                raw_text = getattr(response, "content", "") if not isinstance(response, str) else response
+                arrays = _parse_batch_response(raw_text, len(chunk))
+            except Exception:
+                arrays = {}
             
-            return {
-                "success": True,
-                "rich_text_array": plain_rich_text,
-                "message": f"Formatting failed, returned plain text. Error: {str(e)}",
-                "segments_count": 1,
-                "fallback": True,
-                "format_instructions": format_instructions,
-                "result_text": result_text
-            }
-        except:
-            return {
-                "success": False,
-                "error": str(e),
-                "message": "Critical error in rich text formatting"
-            }
\ No newline at end of file
+            for position, i in enumerate(chunk):
+                format_instructions, result_text = pairs[i]
+                if position in arrays:
+                    results[i] = _array_result(arrays[position], format_instructions, result_text)
+                else:
+                    results[i] = create_formatted_rich_text_array(format_instructions, result_text)
+    
+    return results
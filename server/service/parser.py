@@ -0,0 +1,94 @@
+# Parsing helpers for LLM responses
+import json
+import orjson
+from typing import Any, Iterable, Iterator
+
+_DECODER = json.JSONDecoder()
+
+
+def extract_json(text: str, opener: str = "{") -> Any:
+    """
+    Parse the first JSON object or array in an LLM response.
+
+    Scans to the first opener character and decodes up to the last matching closer with
+    orjson, so code fences and any prose before or after the JSON are ignored. Responses
+    with trailing brackets after the JSON fall back to the stdlib raw_decode.
+
+    Args:
+        text (str): Raw LLM response text
+        opener (str): "{" to extract an object, "[" to extract an array
+
+    Returns:
+        Any: Decoded JSON value
+
+    Raises:
+        ValueError: If no JSON value starts with opener (json.JSONDecodeError is a ValueError)
+    """
+    start = text.find(opener)
+    if start < 0:
+        raise ValueError(f"No JSON {'object' if opener == '{' else 'array'} found in response")
+    end = text.rfind("}" if opener == "{" else "]")
+    try:
+        return orjson.loads(text[start:end + 1])
+    except orjson.JSONDecodeError:
+        value, _ = _DECODER.raw_decode(text, start)
+        return value
+
+
+def iter_json_array_items(chunks: Iterable[str]) -> Iterator[Any]:
+    """
+    Yield the object and array items of the first JSON array in a streamed LLM response.
+
+    Each item is decoded as soon as its closing bracket arrives, so callers can use the
+    first items while the model is still generating the rest. Anything before the array
+    (a code fence, prose) is skipped; top-level scalar items are ignored.
+
+    Args:
+        chunks (Iterable[str]): Response text, in arrival order
+
+    Yields:
+        Any: Decoded array items, in order
+
+    Raises:
+        ValueError: If the response holds no array or ends before the array is closed
+    """
+    buffer = ""
+    pos = 0
+    started = False
+    depth = 0
+    in_string = False
+    escaped = False
+    item_start = 0
+
+    for chunk in chunks:
+        buffer += chunk
+        while pos < len(buffer):
+            char = buffer[pos]
+            pos += 1
+            if not started:
+                started = char == "["
+                if started:
+                    buffer, pos = buffer[pos:], 0
+            elif in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in "{[":
+                if depth == 0:
+                    item_start = pos - 1
+                depth += 1
+            elif char in "}]":
+                if depth == 0:
+                    return
+                depth -= 1
+                if depth == 0:
+                    yield orjson.loads(buffer[item_start:pos])
+                    # Drop the decoded item so the buffer only holds the pending tail
+                    buffer, pos = buffer[pos:], 0
+
+    raise ValueError("Unterminated JSON array in response" if started else "No JSON array found in response")
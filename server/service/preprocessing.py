@@ -1,35 +1,14 @@
-import json
-import re
+import orjson
 from typing import Any, Dict, List
 
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from config.env_config import get_openai_api_key
+from service.llm.llm_client import get_chat_llm
+from service.parser import extract_json
+from service.cache import exec_cache
+from service.cache.exec_cache import cached
+from config.env_config import get_exec_cache_ttl, get_preprocess_cache
 
-load_dotenv()
 
-
-def _strip_code_fences(text: str) -> str:
-    cleaned = text.strip()
-    if cleaned.startswith("```"):
-        cleaned = re.sub(r"^```[a-zA-Z0-9_-]*\n", "", cleaned)
-        cleaned = re.sub(r"\n```$", "", cleaned)
-    return cleaned.strip()
-
-
-def extract_result_text(user_input: str) -> str:
-    """
-    Extract pure text content from user input or generate complete answers for questions
-    
-    Args:
-        user_input: User's free-form request
-        
-    Returns:
-        Plain text content or generated answer
-    """
-    llm = ChatOpenAI(temperature=0.3, model="gpt-4o", api_key=get_openai_api_key())
-    
-    system_prompt = """Extract or generate the actual text content that should appear in the final document based on user input.
+RESULT_TEXT_SYSTEM_PROMPT = """Extract or generate the actual text content that should appear in the final document based on user input.
 
 FOR FORMATTING INSTRUCTIONS:
 - Extract actual text content, ignoring structural and formatting instructions
@@ -81,27 +60,8 @@ Python is a high-level programming language known for its simplicity and versati
 
 Return the complete text content with all generic terms expanded into specific, contextually relevant information."""
 
-    try:
-        response = llm.invoke(f"{system_prompt}\n\nUser input:\n{user_input}\n\nOutput:")
-        raw_text: str = getattr(response, "content", "") if not isinstance(response, str) else response
-        return raw_text.strip()
-    except Exception:
-        return ""
-
 
-def call_preprocessing_agent(user_input: str) -> Dict[str, Any]:
-    """
-    PREPROCESSING_LLM: Separates user input into block structure instructions, text formatting instructions, and extracts pure text content
-    
-    Args:
-        user_input: User's free-form request
-        
-    Returns:
-        {"block_instructions": "...", "format_instructions": "...", "result_text": "...", "success": True/False}
-    """
-    llm = ChatOpenAI(temperature=0, model="gpt-4o", api_key=get_openai_api_key())
-
-    system_prompt = """Analyze the user input and separate it into two DISTINCT types of instructions while PRESERVING ALL ORIGINAL CONTENT:
+PREPROCESSING_SYSTEM_PROMPT = """Analyze the user input and separate it into two DISTINCT types of instructions while PRESERVING ALL ORIGINAL CONTENT:
 
 1) BLOCK_INSTRUCTIONS: ONLY document structure and block creation (NO styling)
    What to include:
@@ -161,18 +121,158 @@ Output:
 
 REMEMBER: Color/Emphasis = FORMAT, Structure/Blocks/URLs = BLOCK. Keep them strictly separated."""
 
+
+# Split and text extraction in ONE request: the preprocessing JSON gains a third key,
+# "result_text", filled by the result text rules, so a user request costs one LLM round-trip
+COMBINED_PREPROCESSING_SYSTEM_PROMPT = f"""{PREPROCESSING_SYSTEM_PROMPT}
+
+3) RESULT_TEXT: the actual text content of the final document, produced by these rules:
+{RESULT_TEXT_SYSTEM_PROMPT}
+
+FINAL RESPONSE FORMAT (overrides the two-key JSON above): return ONLY this JSON object:
+{{
+  "block_instructions": "...",
+  "format_instructions": "...",
+  "result_text": "Complete text content with generic terms expanded"
+}}"""
+
+
+def _has_instructions(parsed: Any) -> bool:
+    """Check a parsed preprocessing object for the two required instruction keys"""
+    return isinstance(parsed, dict) and "block_instructions" in parsed and "format_instructions" in parsed
+
+
+def _result_text_of(parsed: Dict[str, Any]) -> str:
+    """Return the fused result_text, or "" when the model left it out"""
+    result_text = parsed.get("result_text")
+    return result_text.strip() if isinstance(result_text, str) else ""
+
+
+def extract_result_text(user_input: str) -> str:
+    """
+    Extract pure text content from user input or generate complete answers for questions
+    
+    Args:
+        user_input: User's free-form request
+        
+    Returns:
+        Plain text content or generated answer
+    """
+    llm = get_chat_llm("gpt-4o")
+
+    try:
+        response = llm.invoke(f"{RESULT_TEXT_SYSTEM_PROMPT}\n\nUser input:\n{user_input}\n\nOutput:")
+        raw_text: str = getattr(response, "content", "") if not isinstance(response, str) else response
+        return raw_text.strip()
+    except Exception:
+        return ""
+
+
+# Every preprocessing call runs at temperature 0, so with PREPROCESS_CACHE=1 a repeated input gets the
+# stored result instead of another LLM call; the sync, async and batch entry points share the entries.
+# Failures are not cached.
+PREPROCESSING_CACHE_NAMESPACE = "preprocessing"
+
+
+def _preprocessing_cache_ttl() -> float:
+    """EXEC_CACHE_TTL while PREPROCESS_CACHE is enabled, 0 (no caching) otherwise"""
+    return get_exec_cache_ttl() if get_preprocess_cache() else 0
+
+
+_preprocessing_exec_cache = cached(
+    PREPROCESSING_CACHE_NAMESPACE,
+    key_fn=lambda user_input: user_input,
+    ttl=_preprocessing_cache_ttl
+)
+
+
+@_preprocessing_exec_cache
+def call_preprocessing_agent(user_input: str) -> Dict[str, Any]:
+    """
+    PREPROCESSING_LLM: Separates user input into block structure instructions, text formatting instructions, and extracts pure text content
+    
+    Args:
+        user_input: User's free-form request
+        
+    Returns:
+        {"block_instructions": "...", "format_instructions": "...", "result_text": "...", "success": True/False}
+    """
+    llm = get_chat_llm("gpt-4o")
+
+    try:
+        response = llm.invoke(f"{COMBINED_PREPROCESSING_SYSTEM_PROMPT}\n\nUser input:\n{user_input}\n\nGenerate JSON response:")
+        raw_text: str = getattr(response, "content", "") if not isinstance(response, str) else response
+        parsed = extract_json(raw_text, "{")
+        
+        # Validate response format
+        if not _has_instructions(parsed):
+            raise ValueError("Invalid response format")
+        
+        # result_text comes back in the same response; a second call only if it is missing
+        result_text = _result_text_of(parsed) or extract_result_text(user_input)
+            
+        return {
+            "success": True,
+            "block_instructions": parsed["block_instructions"],
+            "format_instructions": parsed["format_instructions"],
+            "result_text": result_text,
+            "error": ""
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "block_instructions": "",
+            "format_instructions": "",
+            "result_text": "",
+            "error": str(e)
+        }
+
+
+async def aextract_result_text(user_input: str) -> str:
+    """
+    Async variant of extract_result_text that awaits the LLM instead of blocking the event loop
+    
+    Args:
+        user_input: User's free-form request
+        
+    Returns:
+        Plain text content or generated answer
+    """
+    llm = get_chat_llm("gpt-4o")
+
+    try:
+        response = await llm.ainvoke(f"{RESULT_TEXT_SYSTEM_PROMPT}\n\nUser input:\n{user_input}\n\nOutput:")
+        raw_text: str = getattr(response, "content", "") if not isinstance(response, str) else response
+        return raw_text.strip()
+    except Exception:
+        return ""
+
+
+@_preprocessing_exec_cache
+async def acall_preprocessing_agent(user_input: str) -> Dict[str, Any]:
+    """
+    Async variant of call_preprocessing_agent that awaits the LLM instead of blocking the event loop
+    
+    Args:
+        user_input: User's free-form request
+        
+    Returns:
+        {"block_instructions": "...", "format_instructions": "...", "result_text": "...", "success": True/False}
+    """
+    llm = get_chat_llm("gpt-4o")
+
     try:
-        response = llm.invoke(f"{system_prompt}\n\nUser input:\n{user_input}\n\nGenerate JSON response:")
+        response = await llm.ainvoke(f"{COMBINED_PREPROCESSING_SYSTEM_PROMPT}\n\nUser input:\n{user_input}\n\nGenerate JSON response:")
         raw_text: str = getattr(response, "content", "") if not isinstance(response, str) else response
-        cleaned = _strip_code_fences(raw_text)
-        parsed = json.loads(cleaned)
+        parsed = extract_json(raw_text, "{")
         
         # Validate response format
-        if not isinstance(parsed, dict) or "block_instructions" not in parsed or "format_instructions" not in parsed:
+        if not _has_instructions(parsed):
             raise ValueError("Invalid response format")
         
-        # Extract pure text content using the new function
-        result_text = extract_result_text(user_input)
+        # result_text comes back in the same response; a second call only if it is missing
+        result_text = _result_text_of(parsed) or await aextract_result_text(user_input)
             
         return {
             "success": True,
@@ -190,3 +290,107 @@ REMEMBER: Color/Emphasis = FORMAT, Structure/Blocks/URLs = BLOCK. Keep them stri
             "result_text": "",
             "error": str(e)
         }
+
+
+def call_preprocessing_agent_batch(user_inputs: List[str]) -> List[Dict[str, Any]]:
+    """
+    Batched PREPROCESSING_LLM: separates several user inputs with a single LLM call
+    
+    Inputs with a cached result (PREPROCESS_CACHE=1) are answered from the execution cache
+    shared with call_preprocessing_agent; only the rest go to the model.
+    
+    Args:
+        user_inputs: List of user free-form requests
+        
+    Returns:
+        List of preprocessing results in input order (same shape as call_preprocessing_agent)
+    """
+    ttl = _preprocessing_cache_ttl()
+    if ttl <= 0:
+        return _run_preprocessing_batch(user_inputs)
+    
+    keys = {user_input: exec_cache.make_key(PREPROCESSING_CACHE_NAMESPACE, user_input) for user_input in user_inputs}
+    results: Dict[str, Dict[str, Any]] = {}
+    for user_input, key in keys.items():
+        value = exec_cache.get(key)
+        if value is not None:
+            results[user_input] = orjson.loads(value)
+    
+    misses = [user_input for user_input in keys if user_input not in results]
+    for user_input, result in zip(misses, _run_preprocessing_batch(misses)):
+        if result["success"]:
+            exec_cache.put(keys[user_input], orjson.dumps(result).decode(), ttl)
+        results[user_input] = result
+    
+    return [results[user_input] for user_input in user_inputs]
+
+
+def _run_preprocessing_batch(user_inputs: List[str]) -> List[Dict[str, Any]]:
+    """
+    Run the batched preprocessing prompt for every input, without the cache
+    
+    The block/format split and result_text for every input are requested in one
+    prompt; result_text is extracted separately (together, through llm.batch) only
+    for inputs the model left it out for. Falls back to per-input
+    call_preprocessing_agent if the batched response can't be parsed.
+    
+    Args:
+        user_inputs: List of user free-form requests
+        
+    Returns:
+        List of preprocessing results in input order (same shape as call_preprocessing_agent)
+    """
+    if not user_inputs:
+        return []
+
+    llm = get_chat_llm("gpt-4o")
+
+    numbered_inputs = "\n\n".join(f"[{i}]\n{user_input}" for i, user_input in enumerate(user_inputs))
+    batch_prompt = f"""{COMBINED_PREPROCESSING_SYSTEM_PROMPT}
+
+BATCH MODE: You will receive {len(user_inputs)} numbered user inputs.
+Return ONLY a JSON array with exactly {len(user_inputs)} objects, in the same order as the inputs,
+each object having the "block_instructions", "format_instructions" and "result_text" keys described above.
+
+User inputs:
+{numbered_inputs}
+
+Generate JSON response:"""
+
+    try:
+        response = llm.invoke(batch_prompt)
+        raw_text: str = getattr(response, "content", "") if not isinstance(response, str) else response
+        parsed = extract_json(raw_text, "[")
+
+        # Validate response format
+        if not isinstance(parsed, list) or len(parsed) != len(user_inputs):
+            raise ValueError("Invalid batch response format")
+        if not all(_has_instructions(item) for item in parsed):
+            raise ValueError("Invalid batch response format")
+    except Exception:
+        return [call_preprocessing_agent(user_input) for user_input in user_inputs]
+
+    result_texts = [_result_text_of(item) for item in parsed]
+
+    # Extract the missing result texts, if any, in one concurrent batch
+    missing = [i for i, result_text in enumerate(result_texts) if not result_text]
+    if missing:
+        text_responses = llm.batch(
+            [f"{RESULT_TEXT_SYSTEM_PROMPT}\n\nUser input:\n{user_inputs[i]}\n\nOutput:" for i in missing],
+            return_exceptions=True
+        )
+        for i, text_response in zip(missing, text_responses):
+            if not isinstance(text_response, Exception):
+                raw_text = getattr(text_response, "content", "") if not isinstance(text_response, str) else text_response
+                result_texts[i] = raw_text.strip()
+
+    results: List[Dict[str, Any]] = []
+    for item, result_text in zip(parsed, result_texts):
+        results.append({
+            "success": True,
+            "block_instructions": item["block_instructions"],
+            "format_instructions": item["format_instructions"],
+            "result_text": result_text,
+            "error": ""
+        })
+    return results
@@ -0,0 +1,189 @@
+# Rule-based rich text formatting for simple, explicit format instructions
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Style keyword → (annotation, value), matching the FORMAT MAPPING of the rich text prompt
+STYLE_KEYWORDS: Dict[str, Tuple[str, Any]] = {
+    "빨간색": ("color", "red"), "red": ("color", "red"),
+    "파란색": ("color", "blue"), "blue": ("color", "blue"),
+    "녹색": ("color", "green"), "초록색": ("color", "green"), "green": ("color", "green"),
+    "노란색": ("color", "yellow"), "yellow": ("color", "yellow"),
+    "보라색": ("color", "purple"), "purple": ("color", "purple"),
+    "분홍색": ("color", "pink"), "pink": ("color", "pink"),
+    "회색": ("color", "gray"), "gray": ("color", "gray"),
+    "굵게": ("bold", True), "bold": ("bold", True), "볼드": ("bold", True),
+    "기울임": ("italic", True), "italic": ("italic", True), "이탤릭": ("italic", True),
+    "밑줄": ("underline", True), "underline": ("underline", True),
+    "취소선": ("strikethrough", True), "strikethrough": ("strikethrough", True),
+    "코드": ("code", True), "code": ("code", True),
+}
+
+# English keywords must be whole words ("red" is not in "required"); Korean ones take particles
+_STYLE_RE = re.compile(
+    "|".join(
+        rf"\b{re.escape(keyword)}\b" if keyword.isascii() else re.escape(keyword)
+        for keyword in sorted(STYLE_KEYWORDS, key=len, reverse=True)
+    ),
+    re.IGNORECASE
+)
+
+# Styling words without a fixed mapping ("주황색", "강조", "highlight"): only the model can apply them
+GENERIC_STYLE_WORDS = frozenset({"색", "color", "colour", "강조", "emphasi", "highlight"})
+_GENERIC_STYLE_RE = re.compile("|".join(map(re.escape, sorted(GENERIC_STYLE_WORDS))), re.IGNORECASE)
+
+# Sentences end at ". ", "! ", "? ", ";" or a line break; styled sentences split further into
+# comma-separated clauses ("HTML은 굵게, CSS는 파란색으로")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|[;\n]+")
+_CLAUSE_RE = re.compile(r"[,，、]")
+
+# Negated or removed styles ("굵게 하지 마세요", "밑줄 없이", "not bold"): left to the model
+_NEGATION_RE = re.compile(
+    r"하지\s*마|말고|말아|않|빼고|제외|없이|해제|없애|지워|\bnot\b|\bdon'?t\b|\bno\b|\bwithout\b|\bremove\b",
+    re.IGNORECASE
+)
+
+# Quoted target phrases: '...', "...", ‘...’, “...”
+_QUOTED_RE = re.compile(r"'([^']+)'|\"([^\"]+)\"|‘([^’]+)’|“([^”]+)”")
+
+# Unquoted Korean target: the word right before an object/topic particle ("자바를 굵게")
+_PARTICLE_TARGET_RE = re.compile(r"([^\s'\"]+?)(?:을|를|은|는)(?=\s)")
+
+# Particles that may follow a target in result_text ("자바를", "자바에서는"); any other
+# trailing letter means the match is part of a longer word ("자바" in "자바스크립트")
+_TRAILING_PARTICLES = "(?:은|는|이|가|을|를|의|에|에서|에게|와|과|도|만|로|으로|까지|부터|처럼|보다|이나|나|랑|이랑|하고)*"
+
+# Vague targets only the model can resolve ("중요한 부분을 빨간색으로")
+_VAGUE_TARGETS = frozenset({"부분", "내용", "단어", "텍스트", "문장", "것", "키워드", "개념", "개념들", "핵심"})
+
+# Shared by every plain rich text object; copy before changing
+DEFAULT_ANNOTATIONS: Dict[str, Any] = {
+    "bold": False,
+    "italic": False,
+    "strikethrough": False,
+    "underline": False,
+    "code": False,
+    "color": "default"
+}
+
+
+def _parse_clause(clause: str) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+    """
+    Turn one styled clause into (target phrase, annotations) rules.
+
+    Returns None when the clause has no explicit target or several unquoted ones, pairs
+    several targets with several styles, gives one annotation two values, negates a style
+    or asks for an unmapped one.
+    """
+    if _NEGATION_RE.search(clause):
+        return None
+
+    # (match, group index) per target, so both the phrase and its span can be read back
+    target_matches = [
+        (match, next(i for i, group in enumerate(match.groups(), 1) if group))
+        for match in _QUOTED_RE.finditer(clause)
+    ]
+    if not target_matches:
+        target_matches = [
+            (match, 1) for match in _PARTICLE_TARGET_RE.finditer(clause)
+            if not _STYLE_RE.fullmatch(match.group(1))
+        ]
+        # "자바를 제목은 굵게": which word is styled is for the model to decide
+        if len(target_matches) > 1:
+            return None
+    targets = [match.group(group) for match, group in target_matches]
+    target_spans = [match.span(group) for match, group in target_matches]
+
+    # Style words inside a target are part of the phrase, not instructions ("소스코드를 굵게")
+    styles = [
+        match.group() for match in _STYLE_RE.finditer(clause)
+        if not any(start <= match.start() and match.end() <= end for start, end in target_spans)
+    ]
+    if not styles or _GENERIC_STYLE_RE.search(_STYLE_RE.sub("", clause)):
+        return None
+
+    annotations: Dict[str, Any] = {}
+    for style in styles:
+        name, value = STYLE_KEYWORDS[style.lower()]
+        # "빨간색으로 ... 파란색으로" in one clause: the pairing is ambiguous
+        if annotations.setdefault(name, value) != value:
+            return None
+
+    if not targets or any(target in _VAGUE_TARGETS for target in targets):
+        return None
+    # Several targets with several styles in one clause: which style goes where is ambiguous
+    if len(targets) > 1 and len(annotations) > 1:
+        return None
+
+    return [(target, annotations) for target in targets]
+
+
+def _parse_rules(format_instructions: str) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+    """
+    Turn each styled sentence into (target phrase, annotations) rules, clause by clause.
+
+    Returns None as soon as any clause of a styled sentence cannot be parsed on its own
+    (see _parse_clause), so the caller can leave those instructions to the model instead
+    of dropping a target or a style.
+    """
+    rules: List[Tuple[str, Dict[str, Any]]] = []
+    for sentence in _SENTENCE_RE.split(format_instructions):
+        if not _STYLE_RE.search(sentence):
+            if _GENERIC_STYLE_RE.search(sentence):
+                return None
+            continue
+
+        for clause in _CLAUSE_RE.split(sentence):
+            if not clause.strip():
+                continue
+            clause_rules = _parse_clause(clause)
+            if clause_rules is None:
+                return None
+            rules.extend(clause_rules)
+    return rules
+
+
+def build_rich_text_array(format_instructions: str, result_text: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Format result_text from explicit "phrase → style" instructions without an LLM call.
+
+    Every styled clause of format_instructions must name its target, quoted or right before
+    a Korean object/topic particle, and every target must occur in result_text as a whole word
+    (optionally followed by a Korean particle). Each occurrence gets the clause's styles;
+    overlapping styles are combined.
+
+    Args:
+        format_instructions (str): Format instructions, one or more sentences
+        result_text (str): Text to format
+
+    Returns:
+        Optional[List[Dict[str, Any]]]: Rich text objects, or None if the instructions need the model
+    """
+    rules = _parse_rules(format_instructions)
+    if not rules:
+        return None
+
+    # Styled spans over result_text; every target must be found at least once as a whole word
+    spans: List[Tuple[int, int, Dict[str, Any]]] = []
+    for target, annotations in rules:
+        occurrences = [
+            (match.start(), match.end(), annotations)
+            for match in re.finditer(rf"(?<!\w){re.escape(target)}(?={_TRAILING_PARTICLES}(?!\w))", result_text)
+        ]
+        if not occurrences:
+            return None
+        spans.extend(occurrences)
+
+    boundaries = sorted({0, len(result_text), *(start for start, _, _ in spans), *(end for _, end, _ in spans)})
+    rich_text_array: List[Dict[str, Any]] = []
+    for start, end in zip(boundaries, boundaries[1:]):
+        annotations = dict(DEFAULT_ANNOTATIONS)
+        for span_start, span_end, span_annotations in spans:
+            if span_start <= start and end <= span_end:
+                annotations.update(span_annotations)
+
+        # Merge with the previous segment when the styles are identical
+        if rich_text_array and rich_text_array[-1]["annotations"] == annotations:
+            rich_text_array[-1]["text"]["content"] += result_text[start:end]
+        else:
+            rich_text_array.append({"type": "text", "text": {"content": result_text[start:end]}, "annotations": annotations})
+    return rich_text_array
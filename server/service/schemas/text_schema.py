@@ -1,11 +1,44 @@
-from pydantic import BaseModel, Field
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from typing_extensions import NotRequired, TypedDict
 
 # ========== Agent Result Schema ==========
 
 class TextResult(BaseModel):
     """Pydantic model for text operation result"""
+    model_config = ConfigDict(frozen=True, extra="forbid")
     success: bool = Field(description="Whether the text operation was successful")
     message: str = Field(description="Result message")
     page_id: str = Field(description="Target page ID")
     blocks_added: int = Field(default=0, description="Number of blocks added")
-    error: str = Field(default="", description="Error message if operation failed") 
\ No newline at end of file
+    error: str = Field(default="", description="Error message if operation failed") 
+# ========== Rich Text Schema ==========
+# TypedDicts rather than models: validated rich text stays a plain dict, ready for the Notion API
+
+class RichTextLink(TypedDict):
+    """Link target of a rich text object"""
+    url: str
+
+class RichTextContent(TypedDict):
+    """Text content of a rich text object"""
+    content: str
+    link: NotRequired[Optional[RichTextLink]]
+
+class RichTextAnnotations(TypedDict, total=False):
+    """Styling of a rich text object; missing keys keep Notion's defaults"""
+    bold: bool
+    italic: bool
+    strikethrough: bool
+    underline: bool
+    code: bool
+    color: str
+
+class RichTextItem(TypedDict):
+    """One Notion rich text object as produced by the formatting LLM"""
+    type: str
+    text: RichTextContent
+    annotations: NotRequired[RichTextAnnotations]
+
+# Compiled once; validate_python checks a whole array in a single call
+RICH_TEXT_ARRAY_ADAPTER: TypeAdapter[List[RichTextItem]] = TypeAdapter(List[RichTextItem])
+RICH_TEXT_ITEM_ADAPTER: TypeAdapter[RichTextItem] = TypeAdapter(RichTextItem)
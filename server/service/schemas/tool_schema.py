@@ -1,13 +1,124 @@
-from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+# Tool inputs are validated once and never mutated; unknown fields are rejected
+# rather than silently dropped, which also marks them closed in the JSON schema
+TOOL_INPUT_CONFIG = ConfigDict(frozen=True, extra="forbid", str_strip_whitespace=True)
 
 # ===================== SEARCH TOOL SCHEMAS =====================
 
 class NotionSearchFilter(BaseModel):
     """Pydantic model for Notion search filter"""
+    model_config = TOOL_INPUT_CONFIG
     property: str = Field(description="Property to filter by")
     value: str = Field(description="Value to filter")
 
 class NotionSearchRequest(BaseModel):
     """Pydantic model for Notion search request"""
+    model_config = TOOL_INPUT_CONFIG
     query: str = Field(description="Search query")
-    filter: NotionSearchFilter = Field(description="Search filter") 
\ No newline at end of file
+    filter: NotionSearchFilter = Field(description="Search filter") 
+
+class PageTitleQuery(BaseModel):
+    """Pydantic model for the search agent output: the page title to look up"""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    page_title: str = Field(description="Title of the Notion page to find, without quotes")
+
+# ===================== BLOCK TOOL SCHEMAS =====================
+
+class PageTarget(BaseModel):
+    """Pydantic model for tools that only need the target page"""
+    model_config = TOOL_INPUT_CONFIG
+    page_id: str = Field(description="Target Notion page ID")
+
+class TextBlockInput(PageTarget):
+    """Pydantic model for text block tools (pass rich_text_array or text)"""
+    rich_text_array: Optional[List[Dict[str, Any]]] = Field(default=None, description="Notion rich text objects; preferred over text")
+    text: Optional[str] = Field(default=None, description="Plain text content")
+
+class HeadingBlockInput(TextBlockInput):
+    """Pydantic model for heading block tool"""
+    level: Optional[int] = Field(default=None, description="Heading level 1-3 (default 1)")
+
+class CalloutBlockInput(TextBlockInput):
+    """Pydantic model for callout block tool"""
+    icon: Optional[str] = Field(default=None, description="Emoji icon (default 💡)")
+
+class CodeBlockInput(TextBlockInput):
+    """Pydantic model for code block tool"""
+    language: Optional[str] = Field(default=None, description="Code language (default python)")
+
+class TodoBlockInput(TextBlockInput):
+    """Pydantic model for todo block tool"""
+    checked: Optional[bool] = Field(default=None, description="Whether the todo is checked")
+
+class EquationBlockInput(PageTarget):
+    """Pydantic model for equation block tool"""
+    expression: Optional[str] = Field(default=None, description="Equation expression")
+
+class TableBlockInput(PageTarget):
+    """Pydantic model for table block tool"""
+    table_width: Optional[int] = Field(default=None, description="Number of columns")
+    table_height: Optional[int] = Field(default=None, description="Number of rows")
+    has_column_header: Optional[bool] = Field(default=None, description="First row is a header")
+    has_row_header: Optional[bool] = Field(default=None, description="First column is a header")
+
+class ImageBlockInput(PageTarget):
+    """Pydantic model for image block tool"""
+    image_url: str = Field(description="Direct image URL")
+    caption: Optional[str] = Field(default=None, description="Image caption")
+
+class VideoBlockInput(PageTarget):
+    """Pydantic model for video block tool"""
+    video_url: str = Field(description="Video URL (e.g. YouTube)")
+    caption: Optional[str] = Field(default=None, description="Video caption")
+
+class EmbedBlockInput(PageTarget):
+    """Pydantic model for embed block tool"""
+    embed_url: str = Field(description="URL to embed")
+    caption: Optional[str] = Field(default=None, description="Embed caption")
+
+class UrlBlockInput(PageTarget):
+    """Pydantic model for URL block tool"""
+    url: str = Field(description="Link URL")
+    title: Optional[str] = Field(default=None, description="Link title")
+
+class BookmarkBlockInput(PageTarget):
+    """Pydantic model for bookmark block tool"""
+    bookmark_url: str = Field(description="Bookmarked URL")
+    caption: Optional[str] = Field(default=None, description="Bookmark caption")
+
+class BlockSpec(BaseModel):
+    """Pydantic model for one block in a batch; fields match the single-block tools"""
+    model_config = TOOL_INPUT_CONFIG
+    type: Literal[
+        "heading", "paragraph", "callout", "quote", "toggle", "todo", "bulleted_list", "numbered_list",
+        "code", "divider", "table_of_contents", "breadcrumb", "equation", "image", "video", "embed",
+        "url", "bookmark", "table"
+    ] = Field(description="Block type")
+    rich_text_array: Optional[List[Dict[str, Any]]] = Field(default=None, description="Rich text objects for text blocks")
+    text: Optional[str] = Field(default=None, description="Plain text for text blocks")
+    level: Optional[int] = Field(default=None, description="Heading level 1-3")
+    icon: Optional[str] = Field(default=None, description="Callout emoji icon")
+    checked: Optional[bool] = Field(default=None, description="Todo checked state")
+    language: Optional[str] = Field(default=None, description="Code language")
+    expression: Optional[str] = Field(default=None, description="Equation expression")
+    image_url: Optional[str] = Field(default=None, description="Image URL")
+    video_url: Optional[str] = Field(default=None, description="Video URL")
+    embed_url: Optional[str] = Field(default=None, description="Embed URL")
+    url: Optional[str] = Field(default=None, description="Link URL")
+    bookmark_url: Optional[str] = Field(default=None, description="Bookmark URL")
+    caption: Optional[str] = Field(default=None, description="Media caption")
+    table_width: Optional[int] = Field(default=None, description="Table columns")
+    table_height: Optional[int] = Field(default=None, description="Table rows")
+    has_column_header: Optional[bool] = Field(default=None, description="Table has column header")
+    has_row_header: Optional[bool] = Field(default=None, description="Table has row header")
+
+class AddBlocksBatchInput(PageTarget):
+    """Pydantic model for batch block creation tool"""
+    blocks: List[BlockSpec] = Field(description="Blocks to append, in order")
+
+class BlockPlan(BaseModel):
+    """Pydantic model for the block planner output: every block for the page, in order"""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    blocks: List[BlockSpec] = Field(description="Blocks to append to the page, in page order")
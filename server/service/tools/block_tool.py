@@ -1,27 +1,55 @@
-from typing import Dict, Any, Union, List
-import json
-from notion_client import Client
-from config.env_config import get_notion_api_key
-from langchain.tools import Tool
-
-# Initialize Notion client
-notion = Client(auth=get_notion_api_key())
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Dict, Any, Iterator, Union, List, Optional, Tuple
+import hashlib
+import logging
+import re
+import orjson
+from service.tools.notion_api import get_async_notion_client, get_notion_client
+from service.schemas.tool_schema import (
+    PageTarget,
+    TextBlockInput,
+    HeadingBlockInput,
+    CalloutBlockInput,
+    CodeBlockInput,
+    TodoBlockInput,
+    EquationBlockInput,
+    TableBlockInput,
+    ImageBlockInput,
+    VideoBlockInput,
+    EmbedBlockInput,
+    UrlBlockInput,
+    BookmarkBlockInput,
+    AddBlocksBatchInput,
+)
+
+if TYPE_CHECKING:
+    from langchain_core.tools import StructuredTool
+
+logger = logging.getLogger(__name__)
 
 # ===================== HELPER FUNCTIONS =====================
 
+def _dumps(obj: Any, default=None) -> str:
+    """Serialize tool input/output with orjson (UTF-8 as-is, so Korean text is not \\u-escaped)"""
+    return orjson.dumps(obj, default=default).decode()
+
+# Optional surrounding code fence ("```json ... ```") or inline backticks, plus whitespace
+_FENCED_JSON_RE = re.compile(r"\A\s*(?:```[a-zA-Z]*|`)?\s*(.*?)\s*(?:```|`)?\s*\Z", re.DOTALL)
+
 def _clean_json_input(input_str: str) -> str:
     """Clean JSON input by removing markdown code blocks"""
     cleaned = input_str.strip()
-    if cleaned.startswith("```json"):
-        cleaned = cleaned[7:]
-    if cleaned.startswith("```"):
-        cleaned = cleaned[3:]
-    if cleaned.endswith("```"):
-        cleaned = cleaned[:-3]
-    # Handle inline backticks
-    if cleaned.startswith("`") and cleaned.endswith("`") and len(cleaned) >= 2:
-        cleaned = cleaned[1:-1]
-    return cleaned.strip()
+    # Unfenced input, the common case, needs no regex
+    if not cleaned.startswith("`"):
+        return cleaned
+    # Plain "```json" / "```" fences are cut literally; anything else goes through the regex
+    for fence in ("```json\n", "```\n"):
+        if cleaned.startswith(fence) and cleaned.endswith("\n```"):
+            return cleaned[len(fence):-4].strip()
+    match = _FENCED_JSON_RE.match(cleaned)
+    return match.group(1) if match else cleaned
 
 # Optimized block creation using dictionaries for configuration
 BLOCK_CONFIGS = {
@@ -42,62 +70,113 @@ def _create_block(block_type: str, content: Union[str, List[Dict]], **kwargs) ->
     else:
         rich_text = [{"type": "text", "text": {"content": str(content)}}]
     
-    block = {
-        "object": "block",
-        "type": block_type,
-        block_type: {"rich_text": rich_text}
-    }
-    
-    # Apply type-specific configuration
-    if block_type in BLOCK_CONFIGS:
-        config = BLOCK_CONFIGS[block_type].copy()
-        config.update({k: v for k, v in kwargs.items() if k in config})
-        block[block_type].update(config)
+    # Build the type payload in one literal: defaults first, then the overrides the type supports
+    config = BLOCK_CONFIGS.get(block_type)
+    if config is None:
+        payload = {"rich_text": rich_text}
+    elif kwargs:
+        payload = {"rich_text": rich_text, **config, **{k: v for k, v in kwargs.items() if k in config}}
+    else:
+        payload = {"rich_text": rich_text, **config}
     
-    return block
+    return {"object": "block", "type": block_type, block_type: payload}
+
+# Structural blocks without per-call fields are constants: built once, shared, never mutated
+# (equation takes its expression)
+STRUCTURAL_BLOCKS = {
+    block_type: {"object": "block", "type": block_type, block_type: payload}
+    for block_type, payload in (("divider", {}), ("table_of_contents", {"color": "default"}), ("breadcrumb", {}))
+}
 
 def _create_structural_block(block_type: str, **kwargs) -> Dict[str, Any]:
     """Create structural blocks without text content"""
-    configs = {
-        "divider": {},
-        "table_of_contents": {"color": "default"},
-        "breadcrumb": {},
-        "equation": {"expression": kwargs.get("expression", "E = mc^2")}
-    }
+    if block_type in STRUCTURAL_BLOCKS:
+        return STRUCTURAL_BLOCKS[block_type]
+    if block_type == "equation":
+        payload = {"expression": kwargs.get("expression", "E = mc^2")}
+    else:
+        payload = {}
     
-    return {
-        "object": "block",
-        "type": block_type,
-        block_type: configs.get(block_type, {})
-    }
+    return {"object": "block", "type": block_type, block_type: payload}
 
-def _create_media_block(block_type: str, url: str, **kwargs) -> Dict[str, Any]:
-    """Create media blocks with correct Notion API structure"""
-    url = url.strip()
-    
+@lru_cache(maxsize=512)
+def _media_payload(block_type: str, url: str, caption: str) -> Dict[str, Any]:
+    """Build (once per type, URL and caption) the media block payload; shared, never mutate it"""
     # Adjust structure based on Notion API requirements for different media types
     if block_type in ["image", "video"]:
-        block_content = {"type": "external", "external": {"url": url}}
+        payload = {"type": "external", "external": {"url": url}}
     elif block_type in ["embed", "bookmark", "link_preview"]:
-        block_content = {"url": url}
+        payload = {"url": url}
     else:
         raise ValueError(f"Unsupported media block type: {block_type}")
     
-    block = {
+    if caption:
+        payload["caption"] = [{"type": "text", "text": {"content": caption}}]
+    
+    return payload
+
+def _create_media_block(block_type: str, url: str, **kwargs) -> Dict[str, Any]:
+    """Create media blocks with correct Notion API structure (payloads of repeated URLs are reused)"""
+    return {
         "object": "block",
         "type": block_type,
-        block_type: block_content
+        block_type: _media_payload(block_type, url.strip(), kwargs.get("caption") or "")
     }
+
+
+# One empty cell shared by every table row; block dicts are only serialized, never mutated
+_EMPTY_TABLE_CELL = [{"type": "text", "text": {"content": ""}}]
+
+def _create_table_block(table_width: int = 1, table_height: int = 1,
+                        has_column_header: bool = False, has_row_header: bool = False) -> Dict[str, Any]:
+    """Create an empty table block with the given dimensions"""
+    # Create empty table data
+    children = [
+        {"type": "table_row", "table_row": {"cells": [_EMPTY_TABLE_CELL] * table_width}}
+        for _ in range(table_height)
+    ]
     
-    if caption := kwargs.get("caption"):
-        block[block_type]["caption"] = [{"type": "text", "text": {"content": caption}}]
-    
-    return block
+    return {
+        "type": "table",
+        "table": {
+            "table_width": table_width,
+            "has_column_header": has_column_header,
+            "has_row_header": has_row_header,
+            "children": children
+        }
+    }
 
 
+# Notion accepts at most 100 children per append request
+NOTION_MAX_CHILDREN_PER_REQUEST = 100
+
 def _append_block_to_page(page_id: str, block: Dict[str, Any]) -> Dict[str, Any]:
-    """Append a single block to a Notion page"""
-    return notion.blocks.children.append(block_id=page_id, children=[block])
+    """Append a single block to a Notion page (a one-block batch)"""
+    return _append_blocks_to_page(page_id, [block])
+
+def _append_blocks_to_page(page_id: str, blocks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Append many blocks to a Notion page using as few requests as possible"""
+    notion = get_notion_client()
+    results = []
+    for start in range(0, len(blocks), NOTION_MAX_CHILDREN_PER_REQUEST):
+        response = notion.blocks.children.append(
+            block_id=page_id,
+            children=blocks[start:start + NOTION_MAX_CHILDREN_PER_REQUEST]
+        )
+        results.extend(response.get("results", []))
+    return {"results": results}
+
+async def _aappend_blocks_to_page(page_id: str, blocks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Async variant of _append_blocks_to_page; chunks are sent one after another to keep block order"""
+    notion_async = get_async_notion_client()
+    results = []
+    for start in range(0, len(blocks), NOTION_MAX_CHILDREN_PER_REQUEST):
+        response = await notion_async.blocks.children.append(
+            block_id=page_id,
+            children=blocks[start:start + NOTION_MAX_CHILDREN_PER_REQUEST]
+        )
+        results.extend(response.get("results", []))
+    return {"results": results}
 
 # ===================== UNIFIED BLOCK CREATION FUNCTIONS =====================
 
@@ -198,37 +277,156 @@ def add_notion_bookmark_block(page_id: str, bookmark_url: str, caption: str = ""
 def add_notion_table_block(page_id: str, table_width: int = 1, table_height: int = 1, 
                           has_column_header: bool = False, has_row_header: bool = False) -> Dict[str, Any]:
     """Add table block to Notion page"""
-    # Create empty table data
-    children = []
-    for row in range(table_height):
-        row_cells = []
-        for col in range(table_width):
-            row_cells.append([{"type": "text", "text": {"content": ""}}])
-        
-        children.append({
-            "type": "table_row",
-            "table_row": {"cells": row_cells}
-        })
+    table_block = _create_table_block(table_width, table_height, has_column_header, has_row_header)
+    return _append_block_to_page(page_id, table_block)
+
+# ===================== BATCH BLOCK CREATION =====================
+
+# Text block aliases accepted by the batch tool → Notion block type
+TEXT_BLOCK_TYPES = {
+    "paragraph": "paragraph",
+    "callout": "callout",
+    "quote": "quote",
+    "toggle": "toggle",
+    "todo": "to_do",
+    "to_do": "to_do",
+    "bulleted_list": "bulleted_list_item",
+    "bulleted_list_item": "bulleted_list_item",
+    "numbered_list": "numbered_list_item",
+    "numbered_list_item": "numbered_list_item",
+    "code": "code"
+}
+
+# Media block aliases accepted by the batch tool → (Notion block type, URL key)
+MEDIA_BLOCK_TYPES = {
+    "image": ("image", "image_url"),
+    "video": ("video", "video_url"),
+    "embed": ("embed", "embed_url"),
+    "url": ("link_preview", "url"),
+    "bookmark": ("bookmark", "bookmark_url")
+}
+
+# Heading level → Notion heading type; other levels fall back to heading_1
+HEADING_BLOCK_TYPES = {1: "heading_1", 2: "heading_2", 3: "heading_3"}
+
+def _heading_block_from_spec(block_type: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+    return _create_block(
+        HEADING_BLOCK_TYPES.get(spec.get("level", 1), "heading_1"),
+        spec.get("rich_text_array", spec.get("text", ""))
+    )
+
+def _text_block_from_spec(block_type: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+    kwargs = {}
+    if "icon" in spec:
+        kwargs["icon"] = {"emoji": spec["icon"]}
+    if "checked" in spec:
+        kwargs["checked"] = spec["checked"]
+    if "language" in spec:
+        kwargs["language"] = spec["language"]
+    return _create_block(TEXT_BLOCK_TYPES[block_type], spec.get("rich_text_array", spec.get("text", "")), **kwargs)
+
+def _structural_block_from_spec(block_type: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+    return STRUCTURAL_BLOCKS[block_type]
+
+def _equation_block_from_spec(block_type: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+    return _create_structural_block("equation", expression=spec.get("expression", "E = mc^2"))
+
+def _media_block_from_spec(block_type: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+    notion_type, url_key = MEDIA_BLOCK_TYPES[block_type]
+    return _create_media_block(notion_type, spec.get(url_key) or spec.get("url", ""), caption=spec.get("caption", ""))
+
+def _table_block_from_spec(block_type: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+    return _create_table_block(
+        spec.get("table_width", 1),
+        spec.get("table_height", 1),
+        spec.get("has_column_header", False),
+        spec.get("has_row_header", False)
+    )
+
+# Batch spec type (or alias) → builder, so each block is one dict lookup instead of a chain of type tests
+SPEC_BLOCK_BUILDERS: Dict[str, Callable[[str, Dict[str, Any]], Dict[str, Any]]] = {
+    "heading": _heading_block_from_spec,
+    **dict.fromkeys(TEXT_BLOCK_TYPES, _text_block_from_spec),
+    **dict.fromkeys(STRUCTURAL_BLOCKS, _structural_block_from_spec),
+    "equation": _equation_block_from_spec,
+    **dict.fromkeys(MEDIA_BLOCK_TYPES, _media_block_from_spec),
+    "table": _table_block_from_spec
+}
+
+def _create_block_from_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Create a Notion block from a batch tool spec such as {"type": "heading", "text": "...", "level": 2}"""
+    block_type = spec.get("type", "paragraph")
+    builder = SPEC_BLOCK_BUILDERS.get(block_type)
+    if builder is None:
+        raise ValueError(f"Unsupported block type: {block_type}")
+    return builder(block_type, spec)
+
+# ===================== DUPLICATE BATCH SUPPRESSION =====================
+# An agent that re-sends, within the same run, the exact batch it already sent (same page, same
+# blocks) is retrying, not asking for a second copy: the earlier result is returned instead.
+# Batches from different runs, or sent outside any run, are always appended
+
+# Batch key → result for the current agent run; None outside block_dedup_scope()
+_run_batches: ContextVar[Optional[Dict[bytes, Dict[str, Any]]]] = ContextVar("_run_batches", default=None)
+
+@contextmanager
+def block_dedup_scope() -> Iterator[None]:
+    """Treat every batch sent inside this block as one agent run; tool calls inherit the scope through the context"""
+    previous = _run_batches.get()
+    _run_batches.set({})
+    try:
+        yield
+    finally:
+        # set() rather than reset(token): an async generator may be closed from another context
+        _run_batches.set(previous)
+
+def _batch_key(page_id: str, blocks: List[Dict[str, Any]]) -> bytes:
+    """Content hash of a batch request"""
+    return hashlib.blake2b(orjson.dumps([page_id, blocks], option=orjson.OPT_SORT_KEYS), digest_size=16).digest()
+
+def add_notion_blocks_batch(page_id: str, blocks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Add many blocks to Notion page in order, batching up to 100 blocks per request"""
+    run_batches = _run_batches.get()
+    if run_batches is None:
+        return _append_blocks_to_page(page_id, [_create_block_from_spec(spec) for spec in blocks])
     
-    table_block = {
-        "type": "table",
-        "table": {
-            "table_width": table_width,
-            "has_column_header": has_column_header,
-            "has_row_header": has_row_header,
-            "children": children
-        }
-    }
+    key = _batch_key(page_id, blocks)
+    if key in run_batches:
+        logger.info("♻️ Duplicate block batch for page %s in this run, reusing the previous result", page_id)
+        # Marked so the caller does not count the earlier batch's blocks twice
+        return {**run_batches[key], "deduplicated": True}
+    result = _append_blocks_to_page(page_id, [_create_block_from_spec(spec) for spec in blocks])
+    run_batches[key] = result
+    return result
+
+async def aadd_notion_blocks_batch(page_id: str, blocks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Async variant of add_notion_blocks_batch that awaits the Notion API instead of blocking"""
+    run_batches = _run_batches.get()
+    if run_batches is None:
+        return await _aappend_blocks_to_page(page_id, [_create_block_from_spec(spec) for spec in blocks])
     
-    return notion.blocks.children.append(block_id=page_id, children=[table_block])
+    key = _batch_key(page_id, blocks)
+    if key in run_batches:
+        logger.info("♻️ Duplicate block batch for page %s in this run, reusing the previous result", page_id)
+        # Marked so the caller does not count the earlier batch's blocks twice
+        return {**run_batches[key], "deduplicated": True}
+    result = await _aappend_blocks_to_page(page_id, [_create_block_from_spec(spec) for spec in blocks])
+    run_batches[key] = result
+    return result
 
 # ===================== UNIFIED TOOL WRAPPER FUNCTIONS =====================
 
 def create_unified_tool_func(block_func, required_params, optional_params=None, success_message="Block added successfully"):
     """Create a unified tool wrapper function"""
+    # Split the parameters once, at creation, instead of on every call
+    content_required = "text" in required_params
+    other_required_params = tuple(p for p in required_params if p != "text")
+    positional_params = tuple(p for p in required_params if p not in ("page_id", "text"))
+    optional_items = tuple((optional_params or {}).items())
+
     def tool_func(input_str: str) -> str:
         try:
-            data = json.loads(_clean_json_input(input_str))
+            data = orjson.loads(_clean_json_input(input_str))
 
             # Handle both text and rich_text_array
             if "rich_text_array" in data:
@@ -241,248 +439,231 @@ def create_unified_tool_func(block_func, required_params, optional_params=None,
                 content = ""
                 content_provided = False
 
-            # Validate required parameters (excluding text since we handle text/rich_text_array above)
-            content_required = "text" in required_params
-            other_required_params = [p for p in required_params if p != "text"]
-            missing = [p for p in other_required_params if not data.get(p)]
-
-            # Check if content is needed: either "text" is required OR rich_text_array is provided
+            # Validate required parameters (excluding text since we handle text/rich_text_array above);
+            # content is needed if "text" is required OR rich_text_array is provided
             needs_content = content_required or "rich_text_array" in data
-            if needs_content and not content_provided:
-                missing.append("text or rich_text_array")
-            if missing:
+            if not all(data.get(p) for p in other_required_params) or (needs_content and not content_provided):
+                missing = [p for p in other_required_params if not data.get(p)]
+                if needs_content and not content_provided:
+                    missing.append("text or rich_text_array")
                 raise ValueError(f"{', '.join(missing)} are required")
 
-            # Prepare arguments
-            args = [data["page_id"]]
-            if content_provided:
-                args.append(content)
-
-            # Add other required params (excluding page_id and text)
-            for param in required_params:
-                if param not in ["page_id", "text"]:
-                    args.append(data[param])
+            # Prepare arguments: page_id, content if given, then the other required params
+            args = [data["page_id"], content] if content_provided else [data["page_id"]]
+            args.extend(data[param] for param in positional_params)
 
             # Add optional parameters
-            kwargs = {}
-            if optional_params:
-                for k, default_val in optional_params.items():
-                    if k in data:
-                        kwargs[k] = data[k]
-                    elif default_val is not None:
-                        kwargs[k] = default_val
+            kwargs = {
+                k: data[k] if k in data else default_val
+                for k, default_val in optional_items
+                if k in data or default_val is not None
+            }
             # Execute function
             result = block_func(*args, **kwargs)
 
-            return json.dumps({
+            return _dumps({
                 "success": True,
                 "message": success_message,
                 "block_id": result["results"][0]["id"] if result.get("results") else None
             })
 
         except Exception as e:
-            return json.dumps({
+            return _dumps({
                 "success": False,
                 "error": str(e)
             })
     
     return tool_func
 
-# ===================== TOOL FUNCTIONS =====================
-
-add_heading_block_tool_func = create_unified_tool_func(
-    add_notion_heading_block, ["page_id"], {"level": 1}, "Added heading block"
-)
-
-add_paragraph_block_tool_func = create_unified_tool_func(
-    add_notion_paragraph_block, ["page_id"], None, "Added paragraph block"
-)
-
-add_callout_block_tool_func = create_unified_tool_func(
-    add_notion_callout_block, ["page_id"], {"icon": "💡"}, "Added callout block"
-)
-
-add_quote_block_tool_func = create_unified_tool_func(
-    add_notion_quote_block, ["page_id"], None, "Added quote block"
-)
-
-add_toggle_block_tool_func = create_unified_tool_func(
-    add_notion_toggle_block, ["page_id"], None, "Added toggle block"
-)
-
-add_todo_block_tool_func = create_unified_tool_func(
-    add_notion_to_do_block, ["page_id"], {"checked": False}, "Added todo block"
-)
-
-add_bulleted_list_tool_func = create_unified_tool_func(
-    add_notion_bulleted_list_block, ["page_id"], None, "Added bulleted list item"
-)
-
-add_numbered_list_tool_func = create_unified_tool_func(
-    add_notion_numbered_list_block, ["page_id"], None, "Added numbered list item"
-)
-
-add_code_block_tool_func = create_unified_tool_func(
-    add_notion_code_block, ["page_id"], {"language": "python"}, "Added code block"
-)
-
-add_divider_block_tool_func = create_unified_tool_func(
-    add_notion_divider_block, ["page_id"], None, "Added divider block"
-)
-
-add_table_of_contents_tool_func = create_unified_tool_func(
-    add_notion_table_of_contents_block, ["page_id"], None, "Added table of contents"
-)
-
-add_breadcrumb_tool_func = create_unified_tool_func(
-    add_notion_breadcrumb_block, ["page_id"], None, "Added breadcrumb"
-)
-
-add_equation_tool_func = create_unified_tool_func(
-    add_notion_equation_block, ["page_id"], {"expression": "E = mc^2"}, "Added equation"
-)
-
-add_image_block_tool_func = create_unified_tool_func(
-    add_notion_image_block, ["page_id", "image_url"], {"caption": ""}, "Added image block"
-)
-
-add_video_block_tool_func = create_unified_tool_func(
-    add_notion_video_block, ["page_id", "video_url"], {"caption": ""}, "Added video block"
-)
-
-add_embed_block_tool_func = create_unified_tool_func(
-    add_notion_embed_block, ["page_id", "embed_url"], {"caption": ""}, "Added embed block"
-)
-
-add_url_block_tool_func = create_unified_tool_func(
-    add_notion_url_block, ["page_id", "url"], {"title": ""}, "Added URL block"
-)
-
-add_bookmark_block_tool_func = create_unified_tool_func(
-    add_notion_bookmark_block, ["page_id", "bookmark_url"], {"caption": ""}, "Added bookmark block"
-)
+def _parse_blocks_batch_input(input_str: str) -> Dict[str, Any]:
+    """Parse and check the batch tool input"""
+    data = orjson.loads(_clean_json_input(input_str))
+    if not data.get("page_id") or not isinstance(data.get("blocks"), list) or not data["blocks"]:
+        raise ValueError("page_id and a non-empty blocks array are required")
+    return data
+
+def _blocks_batch_tool_result(result: Dict[str, Any]) -> str:
+    """Serialize the batch tool result; a deduplicated batch reports the blocks it already added"""
+    blocks_added = len(result["results"])
+    payload = {
+        "success": True,
+        "message": f"Added {blocks_added} blocks",
+        "blocks_added": blocks_added,
+        "block_ids": [block["id"] for block in result["results"]]
+    }
+    if result.get("deduplicated"):
+        payload["message"] = f"Already added these {blocks_added} blocks in this run"
+        payload["deduplicated"] = True
+    return _dumps(payload)
+
+def add_blocks_batch_tool_func(input_str: str) -> str:
+    """Tool wrapper for add_notion_blocks_batch"""
+    try:
+        data = _parse_blocks_batch_input(input_str)
+        return _blocks_batch_tool_result(add_notion_blocks_batch(data["page_id"], data["blocks"]))
+    
+    except Exception as e:
+        return _dumps({
+            "success": False,
+            "error": str(e)
+        })
 
-add_table_tool_func = create_unified_tool_func(
-    add_notion_table_block,
-    ["page_id"],
-    {"table_width": 1, "table_height": 1, "has_column_header": False, "has_row_header": False},
-    "Added table block"
-)
+async def aadd_blocks_batch_tool_func(input_str: str) -> str:
+    """Async tool wrapper for aadd_notion_blocks_batch"""
+    try:
+        data = _parse_blocks_batch_input(input_str)
+        return _blocks_batch_tool_result(await aadd_notion_blocks_batch(data["page_id"], data["blocks"]))
+    
+    except Exception as e:
+        return _dumps({
+            "success": False,
+            "error": str(e)
+        })
 
 # ===================== LANGCHAIN TOOL DEFINITIONS =====================
 
-add_heading_tool = Tool(
-    name="Add Heading Block",
-    description="Add heading block (h1/h2/h3) to Notion page. Supports both text and rich_text_array. Input: JSON with page_id, text/rich_text_array, and optional level (1-3)",
-    func=add_heading_block_tool_func
-)
-
-add_paragraph_tool = Tool(
-    name="Add Paragraph Block", 
-    description="Add paragraph block to Notion page. Supports both text and rich_text_array. Input: JSON with page_id and text/rich_text_array",
-    func=add_paragraph_block_tool_func
-)
-
-add_callout_tool = Tool(
-    name="Add Callout Block",
-    description="Add callout block to Notion page. Supports both text and rich_text_array. Input: JSON with page_id, text/rich_text_array, and optional icon",
-    func=add_callout_block_tool_func
-)
-
-add_quote_tool = Tool(
-    name="Add Quote Block",
-    description="Add quote block to Notion page. Supports both text and rich_text_array. Input: JSON with page_id and text/rich_text_array",
-    func=add_quote_block_tool_func
-)
-
-add_divider_tool = Tool(
-    name="Add Divider Block",
-    description="Add divider line block to Notion page. Input: JSON with page_id",
-    func=add_divider_block_tool_func
-)
-
-add_toggle_tool = Tool(
-    name="Add Toggle Block",
-    description="Add toggle block to Notion page. Supports both text and rich_text_array. Input: JSON with page_id and text/rich_text_array",
-    func=add_toggle_block_tool_func
-)
-
-add_code_tool = Tool(
-    name="Add Code Block",
-    description="Add code block to Notion page. Supports both text and rich_text_array. Input: JSON with page_id, text/rich_text_array, and optional language",
-    func=add_code_block_tool_func
-)
-
-add_todo_tool = Tool(
-    name="Add Todo Block",
-    description="Add todo/checkbox block to Notion page. Supports both text and rich_text_array. Input: JSON with page_id, text/rich_text_array, and optional checked boolean",
-    func=add_todo_block_tool_func
-)
-
-add_bulleted_list_tool_obj = Tool(
-    name="Add Bulleted List Block",
-    description="Add bulleted list item to Notion page. Supports both text and rich_text_array. Input: JSON with page_id and text/rich_text_array",
-    func=add_bulleted_list_tool_func
-)
-
-add_numbered_list_tool_obj = Tool(
-    name="Add Numbered List Block",
-    description="Add numbered list item to Notion page. Supports both text and rich_text_array. Input: JSON with page_id and text/rich_text_array",
-    func=add_numbered_list_tool_func
-)
-
-add_table_of_contents_tool_obj = Tool(
-    name="Add Table of Contents Block",
-    description="Add table of contents block to Notion page. Input: JSON with page_id",
-    func=add_table_of_contents_tool_func
-)
-
-add_breadcrumb_tool_obj = Tool(
-    name="Add Breadcrumb Block",
-    description="Add breadcrumb navigation block to Notion page. Input: JSON with page_id",
-    func=add_breadcrumb_tool_func
-)
-
-add_equation_tool_obj = Tool(
-    name="Add Equation Block",
-    description="Add mathematical equation block to Notion page. Input: JSON with page_id and optional expression",
-    func=add_equation_tool_func
-)
-
-add_table_tool_obj = Tool(
-    name="Add Table Block",
-    description="Add table block to Notion page. Input: JSON with page_id and optional table_width, table_height, has_column_header, has_row_header",
-    func=add_table_tool_func
-)
-
-add_image_tool = Tool(
-    name="Add Image Block",
-    description="Add image block to Notion page. Input: JSON with page_id, image_url, and optional caption",
-    func=add_image_block_tool_func
-)
-
-add_video_tool = Tool(
-    name="Add Video Block",
-    description="Add video block to Notion page. Input: JSON with page_id, video_url, and optional caption",
-    func=add_video_block_tool_func
-)
-
-add_embed_tool = Tool(
-    name="Add Embed Block",
-    description="Add embed block to Notion page. Input: JSON with page_id, embed_url, and optional caption",
-    func=add_embed_block_tool_func
-)
-
-add_url_tool = Tool(
-    name="Add URL Block",
-    description="Add URL link block to Notion page. Input: JSON with page_id, url, and optional title",
-    func=add_url_block_tool_func
-)
-
-add_bookmark_tool = Tool(
-    name="Add Bookmark Block", 
-    description="Add bookmark preview block to Notion page. Input: JSON with page_id, bookmark_url, and optional caption",
-    func=add_bookmark_block_tool_func
-)
+def _structured_block_tool(name: str, description: str, func, args_schema, afunc=None) -> "StructuredTool":
+    """Expose a JSON-string tool function (and optionally its async twin) as a native tool-calling tool with a typed args schema"""
+    # Imported on first tool build: the block builders above are usable without LangChain
+    from langchain_core.tools import StructuredTool
+    
+    def tool_input(kwargs: Dict[str, Any]) -> str:
+        # Drop unset optionals so the wrapper's own defaults apply; nested schemas dump to dicts
+        data = {k: v for k, v in kwargs.items() if v is not None}
+        return _dumps(data, default=lambda m: m.model_dump(exclude_none=True))
+    
+    def run(**kwargs) -> str:
+        return func(tool_input(kwargs))
+    
+    async def arun(**kwargs) -> str:
+        return await afunc(tool_input(kwargs))
+    
+    # Invalid arguments go back to the model as a failed tool result instead of aborting the run
+    return StructuredTool.from_function(
+        func=run,
+        coroutine=arun if afunc is not None else None,
+        name=name,
+        description=description,
+        args_schema=args_schema,
+        handle_validation_error=lambda e: _dumps({"success": False, "error": str(e)})
+    )
+
+
+# ===================== TOOL REGISTRY =====================
+# name → (module attribute, description, block function, required params, optional params with
+# defaults, success message, args schema). The agents only bind add_blocks_batch, so the tool
+# wrappers and tools are built from this table on first use, not at import
+_SINGLE_BLOCK_TOOL_SPECS = {
+    "add_heading_block": (
+        "add_heading_tool", "Add heading block (h1/h2/h3) to Notion page. Supports both text and rich_text_array",
+        add_notion_heading_block, ["page_id"], {"level": 1}, "Added heading block", HeadingBlockInput
+    ),
+    "add_paragraph_block": (
+        "add_paragraph_tool", "Add paragraph block to Notion page. Supports both text and rich_text_array",
+        add_notion_paragraph_block, ["page_id"], None, "Added paragraph block", TextBlockInput
+    ),
+    "add_callout_block": (
+        "add_callout_tool", "Add callout block to Notion page. Supports both text and rich_text_array",
+        add_notion_callout_block, ["page_id"], {"icon": "💡"}, "Added callout block", CalloutBlockInput
+    ),
+    "add_quote_block": (
+        "add_quote_tool", "Add quote block to Notion page. Supports both text and rich_text_array",
+        add_notion_quote_block, ["page_id"], None, "Added quote block", TextBlockInput
+    ),
+    "add_divider_block": (
+        "add_divider_tool", "Add divider line block to Notion page",
+        add_notion_divider_block, ["page_id"], None, "Added divider block", PageTarget
+    ),
+    "add_toggle_block": (
+        "add_toggle_tool", "Add toggle block to Notion page. Supports both text and rich_text_array",
+        add_notion_toggle_block, ["page_id"], None, "Added toggle block", TextBlockInput
+    ),
+    "add_code_block": (
+        "add_code_tool", "Add code block to Notion page. Supports both text and rich_text_array",
+        add_notion_code_block, ["page_id"], {"language": "python"}, "Added code block", CodeBlockInput
+    ),
+    "add_todo_block": (
+        "add_todo_tool", "Add todo/checkbox block to Notion page. Supports both text and rich_text_array",
+        add_notion_to_do_block, ["page_id"], {"checked": False}, "Added todo block", TodoBlockInput
+    ),
+    "add_bulleted_list_block": (
+        "add_bulleted_list_tool_obj", "Add bulleted list item to Notion page. Supports both text and rich_text_array",
+        add_notion_bulleted_list_block, ["page_id"], None, "Added bulleted list item", TextBlockInput
+    ),
+    "add_numbered_list_block": (
+        "add_numbered_list_tool_obj", "Add numbered list item to Notion page. Supports both text and rich_text_array",
+        add_notion_numbered_list_block, ["page_id"], None, "Added numbered list item", TextBlockInput
+    ),
+    "add_table_of_contents_block": (
+        "add_table_of_contents_tool_obj", "Add table of contents block to Notion page",
+        add_notion_table_of_contents_block, ["page_id"], None, "Added table of contents", PageTarget
+    ),
+    "add_breadcrumb_block": (
+        "add_breadcrumb_tool_obj", "Add breadcrumb navigation block to Notion page",
+        add_notion_breadcrumb_block, ["page_id"], None, "Added breadcrumb", PageTarget
+    ),
+    "add_equation_block": (
+        "add_equation_tool_obj", "Add mathematical equation block to Notion page",
+        add_notion_equation_block, ["page_id"], {"expression": "E = mc^2"}, "Added equation", EquationBlockInput
+    ),
+    "add_table_block": (
+        "add_table_tool_obj", "Add table block to Notion page",
+        add_notion_table_block, ["page_id"], {"table_width": 1, "table_height": 1, "has_column_header": False, "has_row_header": False}, "Added table block", TableBlockInput
+    ),
+    "add_image_block": (
+        "add_image_tool", "Add image block to Notion page",
+        add_notion_image_block, ["page_id", "image_url"], {"caption": ""}, "Added image block", ImageBlockInput
+    ),
+    "add_video_block": (
+        "add_video_tool", "Add video block to Notion page",
+        add_notion_video_block, ["page_id", "video_url"], {"caption": ""}, "Added video block", VideoBlockInput
+    ),
+    "add_embed_block": (
+        "add_embed_tool", "Add embed block to Notion page",
+        add_notion_embed_block, ["page_id", "embed_url"], {"caption": ""}, "Added embed block", EmbedBlockInput
+    ),
+    "add_url_block": (
+        "add_url_tool", "Add URL link block to Notion page",
+        add_notion_url_block, ["page_id", "url"], {"title": ""}, "Added URL block", UrlBlockInput
+    ),
+    "add_bookmark_block": (
+        "add_bookmark_tool", "Add bookmark preview block to Notion page",
+        add_notion_bookmark_block, ["page_id", "bookmark_url"], {"caption": ""}, "Added bookmark block", BookmarkBlockInput
+    ),
+}
+_TOOL_NAMES_BY_ATTRIBUTE = {
+    "add_blocks_batch_tool": "add_blocks_batch",
+    **{attribute: name for name, (attribute, *_) in _SINGLE_BLOCK_TOOL_SPECS.items()}
+}
 
-## Removed rich-text-specific duplicate tools. Unified tools below accept either "text" or "rich_text_array".
\ No newline at end of file
+@lru_cache(maxsize=None)
+def get_tool(name: str) -> "StructuredTool":
+    """Get a block tool by its tool name (e.g. "add_heading_block"), building it once on first use"""
+    if name == "add_blocks_batch":
+        return _structured_block_tool(
+            "add_blocks_batch",
+            "Add one or many blocks of any type to Notion page in ONE call, in order. "
+            "Each block has a type plus only the fields that type uses",
+            add_blocks_batch_tool_func,
+            AddBlocksBatchInput,
+            aadd_blocks_batch_tool_func
+        )
+    if name not in _SINGLE_BLOCK_TOOL_SPECS:
+        raise KeyError(f"Unknown block tool: {name}")
+    _, description, block_func, required_params, optional_params, success_message, args_schema = _SINGLE_BLOCK_TOOL_SPECS[name]
+    tool_func = create_unified_tool_func(block_func, required_params, optional_params, success_message)
+    return _structured_block_tool(name, description, tool_func, args_schema)
+
+def get_tools(*names: str) -> Tuple["StructuredTool", ...]:
+    """Get several block tools by tool name, in the given order; only the requested tools are built"""
+    return tuple(map(get_tool, names))
+
+def all_tools() -> Tuple["StructuredTool", ...]:
+    """Get every block tool, the batch tool first"""
+    return (get_tool("add_blocks_batch"), *map(get_tool, _SINGLE_BLOCK_TOOL_SPECS))
+
+def __getattr__(attribute: str) -> "StructuredTool":
+    """Keep `from service.tools.block_tool import add_blocks_batch_tool` (and every other tool) working for the lazily built tools"""
+    if attribute in _TOOL_NAMES_BY_ATTRIBUTE:
+        return get_tool(_TOOL_NAMES_BY_ATTRIBUTE[attribute])
+    raise AttributeError(f"module {__name__!r} has no attribute {attribute!r}")
@@ -0,0 +1,80 @@
+# Shared Notion API client
+from functools import lru_cache
+from typing import TYPE_CHECKING
+import atexit
+import importlib.util
+from config.env_config import get_notion_api_key
+
+if TYPE_CHECKING:
+    from notion_client import AsyncClient, Client
+
+# Keep-alive pool size: enough for concurrent requests across pages without
+# opening a fresh TLS connection to api.notion.com for every block append
+NOTION_MAX_CONNECTIONS = 16
+
+# Idle connections stay open this long (httpx default: 5s), so bursts a minute apart still reuse them
+NOTION_KEEPALIVE_EXPIRY_SEC = 60
+
+# HTTP/2 multiplexes concurrent requests over one connection; it needs the optional h2 package
+NOTION_HTTP2 = importlib.util.find_spec("h2") is not None
+
+# Rate-limited (429) requests are retried in-process, honoring Retry-After, instead of failing
+# the tool call and making the model retry it. The SDK only retries 5xx for GET/DELETE, so a
+# block append is never sent twice. Defaults are 2 retries from 1s, capped at 60s
+NOTION_RETRY = {"max_retries": 4, "initial_retry_delay_ms": 250, "max_retry_delay_ms": 8000}
+
+
+def _pool_options() -> dict:
+    """httpx pool settings shared by the sync and async clients"""
+    import httpx
+    
+    limits = httpx.Limits(
+        max_connections=NOTION_MAX_CONNECTIONS,
+        max_keepalive_connections=NOTION_MAX_CONNECTIONS,
+        keepalive_expiry=NOTION_KEEPALIVE_EXPIRY_SEC
+    )
+    return {"limits": limits, "http2": NOTION_HTTP2}
+
+
+@lru_cache(maxsize=1)
+def get_notion_client() -> "Client":
+    """
+    Get the shared Notion client used by the block and search tools.
+    
+    One httpx connection pool is built once and reused by every tool call,
+    so warm connections are shared instead of each tool module keeping its own.
+    
+    Returns:
+        Client: Cached Notion client
+    """
+    # Imported on first use: notion_client pulls in httpx (~80ms cold)
+    import httpx
+    from notion_client import Client, RetryOptions
+    
+    client = Client(auth=get_notion_api_key(), retry=RetryOptions(**NOTION_RETRY), client=httpx.Client(**_pool_options()))
+    atexit.register(client.close)
+    return client
+
+
+@lru_cache(maxsize=1)
+def get_async_notion_client() -> "AsyncClient":
+    """
+    Get the shared async Notion client used by the async agent and planner paths.
+    
+    Awaiting Notion calls keeps the event loop free while a write is in flight,
+    instead of parking a worker thread on every request.
+    
+    Returns:
+        AsyncClient: Cached async Notion client
+    """
+    import httpx
+    from notion_client import AsyncClient, RetryOptions
+    
+    return AsyncClient(auth=get_notion_api_key(), retry=RetryOptions(**NOTION_RETRY), client=httpx.AsyncClient(**_pool_options()))
+
+
+async def aclose_async_notion_client() -> None:
+    """Close the async client's pool, if it was created; call on event loop shutdown"""
+    if get_async_notion_client.cache_info().currsize:
+        await get_async_notion_client().aclose()
+        get_async_notion_client.cache_clear()
@@ -1,30 +1,24 @@
-from typing import Dict, Any, List, Optional
-from datetime import datetime
-from notion_client import Client
-from config.env_config import get_notion_api_key
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from config.env_config import get_search_cache_ttl
+from service.cache import exec_cache
+from service.tools.notion_api import get_notion_client
 from service.schemas.search_schema import PageInfo, SearchData, SearchResult
-from service.schemas.tool_schema import NotionSearchFilter, NotionSearchRequest
+from service.schemas.tool_schema import NotionSearchFilter
 from langchain_core.tools import Tool
-import re
+import logging
+import threading
+import time
 
-# Initialize Notion client
-notion: Client = Client(auth=get_notion_api_key())
+logger = logging.getLogger(__name__)
 
 # ===================== UTILITY FUNCTIONS =====================
 
 def extract_page_title(page_data: Dict[str, Any]) -> str:
     """Extract page title from Notion page data"""
-    page_title_text: str = ""
-    
-    if "properties" in page_data and "title" in page_data["properties"]:
-        title_property: Dict[str, Any] = page_data["properties"]["title"]
-        if "title" in title_property:
-            title_parts: List[Dict[str, Any]] = title_property["title"]
-            for title_part in title_parts:
-                if "plain_text" in title_part:
-                    page_title_text += title_part["plain_text"]
-    
-    return page_title_text
+    # One join over the title parts: no per-part string concatenation
+    title_parts: List[Dict[str, Any]] = page_data.get("properties", {}).get("title", {}).get("title", [])
+    return "".join(title_part.get("plain_text", "") for title_part in title_parts)
 
 def create_page_info_from_data(page_data: Dict[str, Any], page_title: str) -> PageInfo:
     """Create PageInfo Pydantic model from raw page data"""
@@ -36,45 +30,56 @@ def create_page_info_from_data(page_data: Dict[str, Any], page_title: str) -> Pa
         last_edited_time=page_data.get("last_edited_time", "")
     )
 
-def filter_matching_pages(pages: List[Dict[str, Any]], search_term: str) -> List[PageInfo]:
-    """Filter pages that match the search term using regex"""
-    matching_pages: List[PageInfo] = []
-    
+# Whitespace and quotes around titles and search terms, stripped in one pass
+_TITLE_STRIP_CHARS = " \t\n\r\v\f\"'"
+
+def slim_page(page_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the fields search_tool reads from a Notion page; the cleaned title goes under 'title'"""
+    return {
+        "id": page_data["id"],
+        "url": page_data.get("url", ""),
+        "created_time": page_data.get("created_time", ""),
+        "last_edited_time": page_data.get("last_edited_time", ""),
+        "title": extract_page_title(page_data).strip(_TITLE_STRIP_CHARS)
+    }
+
+def filter_matching_pages(pages: List[Dict[str, Any]], search_term: str) -> Iterator[Tuple[Dict[str, Any], str]]:
+    """
+    Yield (page, title) for slim pages whose title contains the search term, ignoring case
+
+    Matches stay dicts: only the page finally selected is turned into a PageInfo model.
+    """
     # Clean search term - remove quotes and whitespace
-    cleaned_search_term: str = search_term.strip().strip('"').strip("'").strip()
+    cleaned_search_term: str = search_term.strip(_TITLE_STRIP_CHARS)
     
-    # Create regex pattern with case insensitive and unicode support
-    escaped_search_term: str = re.escape(cleaned_search_term)
-    pattern: re.Pattern[str] = re.compile(escaped_search_term, re.IGNORECASE | re.UNICODE)
+    # The term is matched literally, so a casefolded substring check does what an escaped
+    # IGNORECASE regex would, without compiling a pattern per search
+    needle: str = cleaned_search_term.casefold()
+    log_pages: bool = logger.isEnabledFor(logging.DEBUG)
 
     for page in pages:
-        raw_page_title: str = extract_page_title(page)
-        cleaned_page_title: str = raw_page_title.strip().strip('"').strip("'").strip()
+        page_title: str = page["title"]
+        # Untitled pages cannot contain a non-empty term
+        if not page_title and needle:
+            continue
 
-        if pattern.search(cleaned_page_title):
-            page_info: PageInfo = create_page_info_from_data(page, cleaned_page_title)
-            matching_pages.append(page_info)
-            print(f"✅ Matched page: {cleaned_page_title} (created: {page.get('created_time', '')})")
-        else:
-            print(f"❌ No match: {cleaned_page_title}")
-    
-    return matching_pages
+        if needle in page_title.casefold():
+            if log_pages:
+                logger.debug("✅ Matched page: %s (created: %s)", page_title, page["created_time"])
+            yield page, page_title
+        elif log_pages:
+            logger.debug("❌ No match: %s", page_title)
 
-def get_most_recent_page(pages: List[PageInfo]) -> Optional[PageInfo]:
-    """Get the most recently created page from a list of pages"""
-    if not pages:
+def get_most_recent_page(matches: Iterable[Tuple[Dict[str, Any], str]]) -> Optional[PageInfo]:
+    """Get the most recently created page from (raw page, title) matches as a PageInfo"""
+    # Notion timestamps are fixed-width ISO-8601 UTC ("2024-01-31T09:15:00.000Z"), so the
+    # latest one is also the greatest string; one max() pass, no datetime parsing
+    most_recent_match = max(matches, key=lambda match: match[0]["created_time"], default=None)
+    if most_recent_match is None:
         return None
     
-    # Sort by created_time in descending order (most recent first)
-    sorted_pages: List[PageInfo] = sorted(
-        pages, 
-        key=lambda page: datetime.fromisoformat(page.created_time.replace('Z', '+00:00')), 
-        reverse=True
-    )
-    
-    # Return only the most recent page
-    most_recent_page: PageInfo = sorted_pages[0]
-    print(f"🎯 Selected most recent page: {most_recent_page.title} (created: {most_recent_page.created_time})")
+    most_recent_page: PageInfo = create_page_info_from_data(*most_recent_match)
+    logger.info("🎯 Selected most recent page: %s (created: %s)", most_recent_page.title, most_recent_page.created_time)
     
     return most_recent_page
 
@@ -90,11 +95,11 @@ def search_operation(success_message: str = "Search completed successfully", err
     """
     def decorator(func):
         def wrapper(page_title: str) -> SearchResult:
-            print(f"🔍 {func.__name__} called with: '{page_title}'")
+            logger.info("🔍 %s called with: '%s'", func.__name__, page_title)
             
             try:
                 result = func(page_title)
-                print(f"✅ {success_message}: {result}")
+                logger.debug("✅ %s: %s", success_message, result)
                 return result
                 
             except Exception as e:
@@ -103,7 +108,7 @@ def search_operation(success_message: str = "Search completed successfully", err
                     data=SearchData(pages=[], total_found=0),
                     error=f"{error_prefix}: {str(e)}"
                 )
-                print(f"❌ {func.__name__} error: {error_result}")
+                logger.error("❌ %s error: %s", func.__name__, error_result)
                 return error_result
         
         wrapper.__name__ = func.__name__
@@ -112,37 +117,82 @@ def search_operation(success_message: str = "Search completed successfully", err
     
     return decorator
 
+# ===================== SEARCH RESPONSE CACHE =====================
+# Agents often resolve the same page title again right before appending to it; raw search
+# results are kept briefly per normalized query so the repeat skips the Notion round-trip.
+# SEARCH_CACHE_TTL sets how long (0 disables the cache)
+
+SEARCH_CACHE_SIZE = 256
+
+# Execution cache namespace of the search agent, whose answers are built from these results
+SEARCH_AGENT_CACHE_NAMESPACE = "search_agent"
+
+_search_cache: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+_search_cache_lock = threading.Lock()
+
+# The search filter never varies: validated and dumped once instead of on every search
+_PAGE_FILTER: Dict[str, Any] = NotionSearchFilter(property="object", value="page").model_dump()
+
+def _search_cache_key(query: str) -> str:
+    """Normalize a query the way Notion matches it: case-insensitive, surrounding whitespace ignored"""
+    return query.strip().lower()
+
+def _notion_search(query: str) -> List[Dict[str, Any]]:
+    """Search Notion pages and slim every result down to the fields search_tool reads"""
+    response: Dict[str, Any] = get_notion_client().search(query=query.strip(), filter=_PAGE_FILTER)
+    
+    logger.debug("📊 Notion API response: %s", response)
+    
+    # Full page objects (properties, icon, cover, parent, ...) are dropped right away, so
+    # the cache holds a few small dicts per query instead of whole API responses
+    return [slim_page(page) for page in response.get("results", [])]
+
+def _search_pages(query: str) -> List[Dict[str, Any]]:
+    """Run a Notion page search, reusing results for the same query from the last SEARCH_CACHE_TTL seconds"""
+    ttl = get_search_cache_ttl()
+    if ttl <= 0:
+        return _notion_search(query)
+    
+    key = _search_cache_key(query)
+    now = time.monotonic()
+    with _search_cache_lock:
+        entry = _search_cache.get(key)
+        if entry is not None and entry[0] > now:
+            logger.debug("♻️ Search cache hit for '%s'", query)
+            return entry[1]
+    
+    pages: List[Dict[str, Any]] = _notion_search(query)
+    with _search_cache_lock:
+        _search_cache[key] = (now + ttl, pages)
+        _search_cache.move_to_end(key)
+        while len(_search_cache) > SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
+    return pages
+
+def invalidate_search_cache(query: Optional[str] = None) -> None:
+    """
+    Drop the cached results for one query (e.g. after creating a page with that title), or all of them
+    
+    The search agent's stored answers are keyed on the request wording rather than the page
+    title, so they are all dropped either way.
+    """
+    with _search_cache_lock:
+        if query is None:
+            _search_cache.clear()
+        else:
+            _search_cache.pop(_search_cache_key(query), None)
+    exec_cache.clear(SEARCH_AGENT_CACHE_NAMESPACE)
+
 # ===================== SEARCH TOOL FUNCTIONS =====================
 
 @search_operation("Search completed successfully", "Search failed")
 def search_tool(page_title: str) -> SearchResult:
     """Search for pages by title in Notion and return the most recently created page"""
-    # Create search request
-    search_filter: NotionSearchFilter = NotionSearchFilter(
-        property="object",
-        value="page"
-    )
-    
-    search_request: NotionSearchRequest = NotionSearchRequest(
-        query=page_title,
-        filter=search_filter
-    )
-    
     # Search for pages with the given title
-    response: Dict[str, Any] = notion.search(
-        query=search_request.query,
-        filter=search_request.filter.model_dump()
-    )
-    
-    print(f"📊 Notion API response: {response}")
-    
-    pages: List[Dict[str, Any]] = response.get("results", [])
-    
-    # Filter pages that match the title using regex
-    matching_pages: List[PageInfo] = filter_matching_pages(pages, page_title)
+    pages: List[Dict[str, Any]] = _search_pages(page_title)
     
-    # Get the most recent page
-    most_recent_page: Optional[PageInfo] = get_most_recent_page(matching_pages)
+    # Get the most recently created page whose title matches
+    most_recent_page: Optional[PageInfo] = get_most_recent_page(filter_matching_pages(pages, page_title))
     
     # Create final pages list
     final_pages: List[PageInfo] = [most_recent_page] if most_recent_page else []
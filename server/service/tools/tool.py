@@ -1,67 +1,67 @@
 # Main tool import file - exports all Notion API tools
-from .search_tool import search_tool, search_notion_pages_tool
-from .block_tool import (
-    # Core content blocks
-    add_heading_tool,
-    add_paragraph_tool,
-    add_callout_tool,
-    add_quote_tool,
-    add_divider_tool,
-    add_toggle_tool,
-    
-    # Code and lists
-    add_code_tool,
-    add_todo_tool,
-    add_bulleted_list_tool_obj,
-    add_numbered_list_tool_obj,
-    
-    # Navigation and structure
-    add_table_of_contents_tool_obj,
-    add_breadcrumb_tool_obj,
-    add_equation_tool_obj,
-    add_table_tool_obj,
-    
-    # Media blocks
-    add_image_tool,
-    add_video_tool,
-    
-    # Web content
-    add_embed_tool,
-    add_url_tool,
-    add_bookmark_tool
-)
+# Tools are resolved on first attribute access (PEP 562), so importing this module does not
+# import LangChain, the Notion SDK or build every block tool up front
+from importlib import import_module
 
-__all__ = [
-    # Search tools
-    'search_tool',
-    'search_notion_pages_tool',
-    
-    # Core content blocks - LangChain Tool objects
-    'add_heading_tool',
-    'add_paragraph_tool',
-    'add_callout_tool',
-    'add_quote_tool',
-    'add_divider_tool',
-    'add_toggle_tool',
-    
-    # Code and lists - LangChain Tool objects
-    'add_code_tool',
-    'add_todo_tool',
-    'add_bulleted_list_tool_obj',
-    'add_numbered_list_tool_obj',
-    
-    # Navigation and structure - LangChain Tool objects
-    'add_table_of_contents_tool_obj',
-    'add_breadcrumb_tool_obj',
-    'add_equation_tool_obj',
-    'add_table_tool_obj',
-    
-    # Media blocks - LangChain Tool objects
-    'add_image_tool',
-    'add_video_tool',
-    
-    # Web content - LangChain Tool objects
-    'add_embed_tool',
-    'add_url_tool',
-    'add_bookmark_tool'
-]
+# Defining submodule → exported names; the single source of __all__
+_SUBMODULE_EXPORTS = {
+    '.search_tool': (
+        # Search tools
+        'search_tool',
+        'search_notion_pages_tool',
+        'invalidate_search_cache',
+    ),
+    '.block_tool': (
+        # Lookup by tool name
+        'get_tool',
+        'get_tools',
+        'all_tools',
+        
+        # Batch creation - LangChain Tool object
+        'add_blocks_batch_tool',
+        
+        # Core content blocks - LangChain Tool objects
+        'add_heading_tool',
+        'add_paragraph_tool',
+        'add_callout_tool',
+        'add_quote_tool',
+        'add_divider_tool',
+        'add_toggle_tool',
+        
+        # Code and lists - LangChain Tool objects
+        'add_code_tool',
+        'add_todo_tool',
+        'add_bulleted_list_tool_obj',
+        'add_numbered_list_tool_obj',
+        
+        # Navigation and structure - LangChain Tool objects
+        'add_table_of_contents_tool_obj',
+        'add_breadcrumb_tool_obj',
+        'add_equation_tool_obj',
+        'add_table_tool_obj',
+        
+        # Media blocks - LangChain Tool objects
+        'add_image_tool',
+        'add_video_tool',
+        
+        # Web content - LangChain Tool objects
+        'add_embed_tool',
+        'add_url_tool',
+        'add_bookmark_tool',
+    ),
+}
+
+_LAZY_EXPORTS = {name: submodule for submodule, names in _SUBMODULE_EXPORTS.items() for name in names}
+
+__all__ = tuple(_LAZY_EXPORTS)
+
+def __getattr__(name: str):
+    """Import the defining submodule on first access and keep the attribute for later lookups"""
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY_EXPORTS[name], __package__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,29 @@
+# Regression guard for the lazy exports of service.tools.tool
+# Each check runs in a fresh interpreter, since sys.modules here already holds whatever
+# earlier tests imported
+import subprocess
+import sys
+from pathlib import Path
+
+# server/, the directory the app is started from
+SERVER_DIR = Path(__file__).resolve().parents[1]
+
+
+def _run(code: str) -> str:
+    """Run code in a new interpreter from server/ and return its stripped stdout"""
+    return subprocess.check_output([sys.executable, "-c", code], cwd=SERVER_DIR, text=True).strip()
+
+
+def test_block_tool_not_loaded_eagerly():
+    """Importing the tool module must not import block_tool (LangChain, the Notion SDK, every block tool)"""
+    code = "import sys, service.tools.tool; print('service.tools.block_tool' in sys.modules)"
+    assert _run(code) == "False", "service.tools.tool imported block_tool eagerly; lazy exports regressed"
+
+
+def test_all_exports_resolve():
+    """Every name in __all__ must resolve, so a typo in the lazy export table fails here"""
+    code = (
+        "import service.tools.tool as tool;"
+        "print(','.join(name for name in tool.__all__ if getattr(tool, name, None) is None))"
+    )
+    assert _run(code) == "", "unresolved exports in service.tools.tool.__all__"